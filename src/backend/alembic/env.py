@@ -18,6 +18,7 @@ fileConfig(config.config_file_name)
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 from app.db import Base  # noqa
+from app.conf.config import settings  # noqa
 
 target_metadata = Base.metadata
 
@@ -27,8 +28,21 @@ target_metadata = Base.metadata
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
+def include_object(object, name, type_, reflected, compare_to):
+    """
+    Full-text search objects are maintained by raw SQL (app.db.search), keep autogenerate off them
+    """
+    if type_ == 'table' and reflected and '_fts' in name:
+        return False
+    if type_ == 'column' and name == 'search_vector':
+        return False
+    if type_ == 'index' and name and name.endswith('_search_vector'):
+        return False
+    return True
+
+
 def get_url()->str:
-    return 'sqlite:///sqlite.db'
+    return settings.SQLALCHEMY_DATABASE_URI
 
 
 def run_migrations_offline():
@@ -49,6 +63,7 @@ def run_migrations_offline():
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -74,7 +89,7 @@ def run_migrations_online():
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,70 @@
+"""3_search_index
+
+Revision ID: 40f309acacb8
+Revises: afe6441df496
+Create Date: 2026-10-18 14:32:05.118204
+
+"""
+from alembic import op
+
+from app.conf.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision = '40f309acacb8'
+down_revision = 'afe6441df496'
+branch_labels = None
+depends_on = None
+
+# table: indexed columns, the first ones weigh more in the ranking
+SEARCH_INDEXES = {
+    'message': ('title', 'body', 'fullname', 'email'),
+    'post': ('title', 'content'),
+}
+
+
+def upgrade_sqlite(table, columns):
+    fts = f'{table}_fts'
+    names = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    op.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{table}', content_rowid='id')")
+    op.execute(f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+               f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END")
+    op.execute(f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+               f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); END")
+    op.execute(f"CREATE TRIGGER {fts}_au AFTER UPDATE ON {table} BEGIN "
+               f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); "
+               f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END")
+    # Index the existing rows
+    op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def upgrade_postgresql(table, columns):
+    vector = ' || '.join(
+        f"setweight(to_tsvector('{settings.SEARCH_CONFIG}'::regconfig, coalesce({column}, '')), '{weight}')"
+        for column, weight in zip(columns, 'ABCD')
+    )
+    op.execute(f'ALTER TABLE "{table}" ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({vector}) STORED')
+    op.execute(f'CREATE INDEX ix_{table}_search_vector ON "{table}" USING gin (search_vector)')
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for table, columns in SEARCH_INDEXES.items():
+        if dialect == 'sqlite':
+            upgrade_sqlite(table, columns)
+        elif dialect == 'postgresql':
+            upgrade_postgresql(table, columns)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table in SEARCH_INDEXES:
+        if dialect == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f'DROP TRIGGER IF EXISTS {table}_fts_{suffix}')
+            op.execute(f'DROP TABLE IF EXISTS {table}_fts')
+        elif dialect == 'postgresql':
+            op.execute(f'DROP INDEX IF EXISTS ix_{table}_search_vector')
+            op.execute(f'ALTER TABLE "{table}" DROP COLUMN IF EXISTS search_vector')
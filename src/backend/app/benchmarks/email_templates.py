@@ -0,0 +1,82 @@
+"""
+Rendering cost of the contact notification email, run with
+
+    python -m app.benchmarks.email_templates [--seconds 1]
+
+"per send" is the former read + parse on every call, "cached" the shared email environment,
+the "cold" rows build a fresh environment per render as a restarted worker does,
+without and with a warm bytecode cache
+"""
+import argparse
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, List, Tuple
+
+import jinja2
+from emails.template import JinjaTemplate
+
+from app.conf.config import settings
+from app.utils.emails import email_templates
+from app.utils.templating import templates
+
+TEMPLATE_NAME = 'contact_messages.html'
+
+
+def get_context() -> dict:
+    message = SimpleNamespace(
+        fullname='Jane Doe', company_name='Example', email='jane@example.com', phone_number='+1 555 0100',
+        title='Hello', body='Lorem ipsum dolor sit amet ' * 20, created_at=datetime.now(),
+    )
+    return {'site_name': 'Example', 'message': message}
+
+
+def cold_environment(bytecode_cache=None) -> jinja2.Environment:
+    return templates.env.overlay(
+        loader=jinja2.FileSystemLoader(settings.EMAIL_TEMPLATES_DIR), bytecode_cache=bytecode_cache, cache_size=0,
+    )
+
+
+def get_candidates(cache_dir: str) -> List[Tuple[str, Callable[[dict], str]]]:
+    def per_send(context: dict) -> str:
+        with open(Path(settings.EMAIL_TEMPLATES_DIR) / TEMPLATE_NAME) as f:
+            return JinjaTemplate(f.read(), environment=templates.env).render(**context)
+
+    bytecode_cache = jinja2.FileSystemBytecodeCache(cache_dir)
+    cold_environment(bytecode_cache).get_template(TEMPLATE_NAME)
+    return [
+        ('per send', per_send),
+        ('cached', lambda context: email_templates.get_template(TEMPLATE_NAME).render(**context)),
+        ('cold, no bytecode cache', lambda context: cold_environment().get_template(TEMPLATE_NAME).render(**context)),
+        ('cold, bytecode cache', lambda context: cold_environment(bytecode_cache).get_template(
+            TEMPLATE_NAME).render(**context)),
+    ]
+
+
+def renders_per_second(func: Callable[[dict], str], context: dict, seconds: float) -> float:
+    count = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        func(context)
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=1, help='Duration of each measurement')
+    args = parser.parse_args()
+
+    context = get_context()
+    print(f"{'render':<28}{'per second':>12}{'ms':>10}")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name, func in get_candidates(cache_dir):
+            rate = renders_per_second(func, context, args.seconds)
+            print(f"{name:<28}{rate:>12.0f}{1000 / rate:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+In-process SMTP server accepting every message, for benchmarks and local runs
+
+    with FakeSMTPServer(connect_delay=0.05) as server:
+        send_to('127.0.0.1', server.port)
+        print(server.stats())
+
+`connect_delay` stands in for the TCP + TLS handshake and login of a real relay,
+`message_delay` for the time it takes to accept a message
+"""
+import socketserver
+import threading
+import time
+from typing import Optional
+
+__all__ = ('FakeSMTPServer',)
+
+
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+    server: "FakeSMTPServer"
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self) -> None:
+        server = self.server
+        time.sleep(server.connect_delay)
+        server.count('connections')
+        self.reply('220 fake ESMTP ready')
+        in_data = False
+        for line in self.rfile:
+            if in_data:
+                if line.rstrip(b'\r\n') == b'.':
+                    in_data = False
+                    time.sleep(server.message_delay)
+                    server.count('messages')
+                    self.reply('250 OK queued')
+                continue
+            command = line[:4].upper()
+            if command == b'EHLO':
+                self.reply('250-fake')
+                self.reply('250 8BITMIME')
+            elif command == b'RCPT':
+                server.count('recipients')
+                self.reply('250 OK')
+            elif command == b'DATA':
+                in_data = True
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+            elif command == b'QUIT':
+                self.reply('221 Bye')
+                return
+            elif command in (b'HELO', b'MAIL', b'RSET', b'NOOP'):
+                self.reply('250 OK')
+            else:
+                self.reply('502 Command not implemented')
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, connect_delay: float = 0, message_delay: float = 0):
+        super().__init__((host, port), FakeSMTPHandler)
+        self.connect_delay = connect_delay
+        self.message_delay = message_delay
+        self.counters = {'connections': 0, 'messages': 0, 'recipients': 0}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counters)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters = dict.fromkeys(self.counters, 0)
+
+    def __enter__(self) -> "FakeSMTPServer":
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-smtp', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == '__main__':
+    with FakeSMTPServer(port=1025) as fake_server:
+        print(f'Fake SMTP server on 127.0.0.1:{fake_server.port}, Ctrl+C to stop')
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            print(fake_server.stats())
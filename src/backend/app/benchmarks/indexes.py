@@ -0,0 +1,113 @@
+"""
+Latency of the hot repository queries without and with the indexes of migration 24a6cd3f9274,
+on a throwaway SQLite database, run with
+
+    python -m app.benchmarks.indexes [--messages 200000] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import Callable, List, Tuple
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session, sessionmaker
+
+import app.db  # noqa: F401, registers every model
+from app.contrib.auth.repository import email_repo
+from app.contrib.contact_us.models import Message
+from app.contrib.contact_us.repository import message_repo
+from app.db.models import Base
+from app.db.pagination import decode_cursor
+
+INDEXES = {
+    'ix_message_created_at_id': 'CREATE INDEX ix_message_created_at_id ON message (created_at, id)',
+    'ix_email_is_active': 'CREATE INDEX ix_email_is_active ON email (is_active)',
+}
+
+
+def populate(db: Session, messages: int) -> None:
+    started = datetime(2021, 1, 1)
+    rows = []
+    for i in range(messages):
+        created_at = started + timedelta(seconds=random.randrange(2 * 365 * 24 * 3600))
+        rows.append({
+            'fullname': f'Name {i}', 'email': f'lead{i}@example.com', 'title': f'Lead {i}',
+            'body': 'Lorem ipsum dolor sit amet ' * 8, 'created_at': created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        })
+    # Text, as server_default=now() stores it on SQLite
+    db.execute(text(
+        'INSERT INTO message (fullname, email, title, body, created_at) '
+        'VALUES (:fullname, :email, :title, :body, :created_at)'
+    ), rows)
+    db.execute(email_repo.model.__table__.insert(), [
+        {'email': f'staff{i}@example.com', 'is_active': i % 50 == 0} for i in range(20000)
+    ])
+    db.commit()
+
+
+def get_queries(db: Session) -> List[Tuple[str, Callable[[], object]]]:
+    newest_first = (Message.created_at.desc(),)
+    columns = ('id', 'title', 'email', 'created_at')
+    # A cursor halfway down the list
+    cursor_row = db.execute(text(
+        'SELECT created_at, id FROM message ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET '
+        '(SELECT count(*) / 2 FROM message)'
+    )).first()
+    page = message_repo.get_page(db, order_by=newest_first, columns=columns, limit=1, cursor={
+        'values': [datetime.fromisoformat(cursor_row[0]), cursor_row[1]], 'direction': 'next',
+    })
+    deep_cursor = decode_cursor(page.next_cursor)
+    return [
+        ('message list, first page', lambda: message_repo.get_page(db, order_by=newest_first, columns=columns)),
+        ('message list, deep page', lambda: message_repo.get_page(
+            db, order_by=newest_first, columns=columns, cursor=deep_cursor)),
+        ('message export, 1 week', lambda: list(islice(message_repo.iter_export(
+            db, date_from=date(2022, 3, 1), date_to=date(2022, 3, 7)), 100000))),
+        ('active notification emails', lambda: email_repo.get_all(db, q={'is_active': True}, limit=None)),
+    ]
+
+
+def measure(func: Callable, repeat: int) -> float:
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=200000, help='Rows in the message table')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs of each query')
+    args = parser.parse_args()
+
+    random.seed(0)
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    engine = create_engine(f'sqlite:///{path}')
+    try:
+        Base.metadata.create_all(engine)
+        with sessionmaker(bind=engine)() as db:
+            populate(db, args.messages)
+            results = {}
+            for phase in ('before', 'after'):
+                for name, ddl in INDEXES.items():
+                    db.execute(text(f'DROP INDEX IF EXISTS {name}') if phase == 'before' else text(ddl))
+                db.execute(text('ANALYZE'))
+                db.commit()
+                for name, query in get_queries(db):
+                    results.setdefault(name, {})[phase] = measure(query, args.repeat)
+        print(f"{'query':<30}{'before ms':>12}{'after ms':>12}")
+        for name, timings in results.items():
+            print(f"{name:<30}{timings['before']:>12.2f}{timings['after']:>12.2f}")
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Encode/decode throughput of the JWT backends, run with
+
+    python -m app.benchmarks.jwt_handlers [--seconds 1]
+
+The decode cache is bypassed so the numbers are the cost of a real signature check
+"""
+import argparse
+import secrets
+import time
+from typing import Callable, List, Tuple
+
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+from app.utils.jwt_backends import BaseJWTBackend, JoseJWTBackend, PyJWTBackend
+from app.utils.security import jwt_payload, serialize_key_pair
+
+
+def get_candidates() -> List[Tuple[str, BaseJWTBackend]]:
+    rsa_keys = serialize_key_pair(rsa.generate_private_key(public_exponent=65537, key_size=2048))
+    ec_keys = serialize_key_pair(ec.generate_private_key(ec.SECP256R1()))
+    ed_keys = serialize_key_pair(ed25519.Ed25519PrivateKey.generate())
+    secret = secrets.token_urlsafe(32)
+    return [
+        ('jose RS256', JoseJWTBackend('RS256', rsa_keys['private_key'], rsa_keys['public_key'])),
+        ('pyjwt RS256', PyJWTBackend('RS256', rsa_keys['private_key'], rsa_keys['public_key'])),
+        ('jose ES256', JoseJWTBackend('ES256', ec_keys['private_key'], ec_keys['public_key'])),
+        ('pyjwt ES256', PyJWTBackend('ES256', ec_keys['private_key'], ec_keys['public_key'])),
+        ('pyjwt EdDSA', PyJWTBackend('EdDSA', ed_keys['private_key'], ed_keys['public_key'])),
+        ('jose HS256', JoseJWTBackend('HS256', secret)),
+        ('pyjwt HS256', PyJWTBackend('HS256', secret)),
+    ]
+
+
+def ops_per_second(func: Callable, seconds: float) -> float:
+    count = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while True:
+        func()
+        count += 1
+        now = time.perf_counter()
+        if now >= deadline:
+            return count / (now - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=1.0, help='Time spent on each measurement')
+    args = parser.parse_args()
+
+    payload = jwt_payload({'user_id': 1})
+    print(f"{'backend':<14}{'encode ops/s':>16}{'decode ops/s':>16}")
+    for name, backend in get_candidates():
+        token = backend.encode(payload)
+        encode = ops_per_second(lambda: backend.encode(payload), args.seconds)
+        decode = ops_per_second(lambda: backend.decode(token), args.seconds)
+        print(f'{name:<14}{encode:>16,.0f}{decode:>16,.0f}')
+
+
+if __name__ == '__main__':
+    main()
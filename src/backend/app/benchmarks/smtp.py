@@ -0,0 +1,69 @@
+"""
+Notification fan-out over a fake SMTP server: one connection per recipient, one pooled
+session and pooled sessions sending in parallel, run with
+
+    python -m app.benchmarks.smtp [--recipients 200] [--connect-delay 0.05] [--message-delay 0.01]
+"""
+import argparse
+import time
+from typing import Callable, List, Tuple
+
+from emails.backend import SMTPBackend
+
+from app.benchmarks.fake_smtp import FakeSMTPServer
+from app.utils.emails import get_message, send_fanout, send_message
+from app.utils.smtp import SMTPPool
+
+
+SUBJECT = 'New contact message'
+HTML = '<p>' + 'Lorem ipsum dolor sit amet ' * 40 + '</p>'
+MAIL_FROM = ('Benchmark', 'benchmark@example.com')
+
+
+def connection_per_send(options: dict, emails_to: List[str]) -> None:
+    message = get_message(SUBJECT, HTML, MAIL_FROM)
+    for email_to in emails_to:
+        with SMTPBackend(**options) as smtp:
+            assert message.send(to=email_to, smtp=smtp).success
+
+
+def pooled_session(options: dict, emails_to: List[str]) -> None:
+    pool = SMTPPool(options)
+    assert all(response.success for response in send_message(get_message(SUBJECT, HTML, MAIL_FROM), emails_to, pool=pool))
+    pool.close()
+
+
+def pooled_fanout(options: dict, emails_to: List[str]) -> None:
+    pool = SMTPPool(options, maxsize=4)
+    assert not any(send_fanout(SUBJECT, HTML, emails_to, mail_from=MAIL_FROM, concurrency=4, pool=pool).values())
+    pool.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--recipients', type=int, default=200)
+    parser.add_argument('--connect-delay', type=float, default=0.05, help='Seconds per connection (TLS handshake)')
+    parser.add_argument('--message-delay', type=float, default=0.01, help='Seconds the server takes per message')
+    args = parser.parse_args()
+
+    emails_to = [f'staff{i}@example.com' for i in range(args.recipients)]
+    candidates: List[Tuple[str, Callable]] = [
+        ('connection per send', connection_per_send),
+        ('pooled session', pooled_session),
+        ('pooled fan-out x4', pooled_fanout),
+    ]
+    print(f"{'transport':<24}{'seconds':>10}{'msg/s':>10}{'connections':>14}")
+    with FakeSMTPServer(connect_delay=args.connect_delay, message_delay=args.message_delay) as server:
+        options = {'host': '127.0.0.1', 'port': server.port}
+        for name, func in candidates:
+            server.reset()
+            started = time.perf_counter()
+            func(options, emails_to)
+            elapsed = time.perf_counter() - started
+            stats = server.stats()
+            assert stats['messages'] == args.recipients, stats
+            print(f"{name:<24}{elapsed:>10.2f}{args.recipients / elapsed:>10.0f}{stats['connections']:>14}")
+
+
+if __name__ == '__main__':
+    main()
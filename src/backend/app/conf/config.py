@@ -5,6 +5,26 @@ from pydantic import AnyHttpUrl, BaseSettings, EmailStr, validator
 from datetime import timedelta
 
 
+def normalize_db_uri(uri: str) -> str:
+    # postgres:// (Heroku, many PaaS) is not accepted by SQLAlchemy 1.4
+    if uri.startswith('postgres://'):
+        return 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+def get_async_db_uri(uri: str) -> str:
+    """
+    Async driver flavour of a sync database uri
+    """
+    scheme, sep, rest = uri.partition('://')
+    dialect = scheme.split('+', 1)[0]
+    if dialect == 'sqlite':
+        return f'sqlite+aiosqlite{sep}{rest}'
+    if dialect in ('postgresql', 'postgres'):
+        return f'postgresql+asyncpg{sep}{rest}'
+    raise ValueError(f'Can not derive async database uri from {scheme!r}, set ASYNC_SQLALCHEMY_DATABASE_URI')
+
+
 class Settings(BaseSettings):
     # Dirs
     BASE_DIR: Optional[str] = Path(__file__).resolve().parent.parent.parent.as_posix()
@@ -41,6 +61,49 @@ class Settings(BaseSettings):
         return v
 
     SQLALCHEMY_DATABASE_URI: Optional[str] = 'sqlite:///sqlite.db'
+    ASYNC_SQLALCHEMY_DATABASE_URI: Optional[str] = None
+
+    @validator("SQLALCHEMY_DATABASE_URI", pre=True)
+    def normalize_db_uri(cls, v: Optional[str]) -> Optional[str]:
+        return normalize_db_uri(v) if v else v
+
+    @validator("ASYNC_SQLALCHEMY_DATABASE_URI", pre=True, always=True)
+    def assemble_async_db_uri(cls, v: Optional[str], values: Dict[str, Any]) -> str:
+        if v:
+            return v
+        return get_async_db_uri(values.get("SQLALCHEMY_DATABASE_URI") or '')
+
+    # Read replicas of SQLALCHEMY_DATABASE_URI, repository reads are spread over them round-robin
+    SQLALCHEMY_REPLICA_URIS: List[str] = []
+    # Seconds a replica that failed to connect is left out before it is tried again
+    SQLALCHEMY_REPLICA_RETRY_INTERVAL: int = 30
+    # Seconds between the background SELECT 1 checks of every replica, 0 disables them
+    SQLALCHEMY_REPLICA_PROBE_INTERVAL: int = 5
+
+    @validator("SQLALCHEMY_REPLICA_URIS", pre=True)
+    def assemble_replica_uris(cls, v: Union[str, List[str]]) -> List[str]:
+        if isinstance(v, str):
+            v = [i.strip() for i in v.split(",") if i.strip()]
+        return [normalize_db_uri(i) for i in v]
+
+    # Pool of Postgres (or other server) engines, SQLite file databases open a connection per checkout
+    SQLALCHEMY_POOL_SIZE: int = 5
+    SQLALCHEMY_MAX_OVERFLOW: int = 10
+    SQLALCHEMY_POOL_RECYCLE: int = 1800
+    SQLALCHEMY_POOL_TIMEOUT: int = 30
+    # Test connections on checkout, None: only for server databases
+    SQLALCHEMY_POOL_PRE_PING: Optional[bool] = None
+
+    # Pragmas run on every new SQLite connection, WAL lets readers run next to the single writer.
+    # WAL keeps -wal/-shm files next to the database, they must live on the same volume
+    SQLITE_JOURNAL_MODE: str = 'WAL'
+    SQLITE_SYNCHRONOUS: str = 'NORMAL'
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_BUSY_TIMEOUT: int = 5000
+
+    # Milliseconds, 0 disables
+    POSTGRES_STATEMENT_TIMEOUT: int = 30000
+
     SMTP_TLS: Optional[bool] = True
     SMTP_PORT: Optional[int] = 587
     SMTP_HOST: Optional[str] = 'smtp.mail.ru'
@@ -48,12 +111,31 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: Optional[str] = None
     EMAILS_FROM_EMAIL: Optional[EmailStr] = None
     EMAILS_FROM_NAME: Optional[str] = None
+    # SMTP sessions kept open between sends, closed after SMTP_POOL_IDLE_TIMEOUT seconds unused.
+    # A notification is sent to its recipients over SMTP_FANOUT_CONCURRENCY sessions in parallel,
+    # keep the pool at least as large
+    SMTP_POOL_SIZE: int = 4
+    SMTP_POOL_IDLE_TIMEOUT: int = 30
+    SMTP_FANOUT_CONCURRENCY: int = 4
 
     EMAIL_RESET_TOKEN_EXPIRE_HOURS: int = 48
     EMAIL_TEMPLATES_DIR: Optional[str] = "app/email-templates/build"
+    # Compiled Jinja templates kept on disk between restarts, None: a per user directory in the system temp dir
+    JINJA_BYTECODE_CACHE_DIR: Optional[str] = None
     EMAILS_ENABLED: Optional[bool] = True
 
     EMAIL_TEST_USER: EmailStr = "test@example.com"  # type: ignore
+
+    # Outbox worker (python -m app.outbox_worker): jobs claimed per batch, seconds to sleep when
+    # the queue is empty, seconds a claimed job stays hidden from other workers
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_POLL_INTERVAL: float = 2
+    OUTBOX_LEASE: int = 300
+    # Failed jobs are retried after OUTBOX_RETRY_DELAY * 2 ** (attempts - 1) seconds, at most
+    # OUTBOX_RETRY_MAX_DELAY, and given up after OUTBOX_MAX_ATTEMPTS
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_RETRY_DELAY: int = 30
+    OUTBOX_RETRY_MAX_DELAY: int = 3600
     FIRST_SUPERUSER: EmailStr
     FIRST_SUPERUSER_PASSWORD: str
 
@@ -70,6 +152,47 @@ class Settings(BaseSettings):
 
     LANGUAGE_CODE: Optional[str] = 'ru'
 
+    # New hashes use the first scheme, the others are only verified and upgraded on login
+    PASSWORD_SCHEMES: List[str] = ['bcrypt']
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_ARGON2_TIME_COST: int = 2
+    PASSWORD_ARGON2_MEMORY_COST: int = 102400
+    PASSWORD_ARGON2_PARALLELISM: int = 8
+    # Password hashing runs on its own pool, logins beyond PASSWORD_HASHER_MAX_PENDING get a 503
+    PASSWORD_HASHER_WORKERS: int = 2
+    PASSWORD_HASHER_MAX_PENDING: int = 32
+
+    # Seconds a worker trusts its cached Config row before re-reading the version stamp
+    CONFIG_CACHE_RECHECK: int = 5
+
+    # CRUDBase.count: 'exact', 'cached' or 'estimated' (from pg_class / sqlite_stat1 above the threshold).
+    # 'cached' is invalidated by the commits of this process only, other workers may serve a count
+    # up to COUNT_CACHE_TTL seconds old, so it suits single worker setups or lists tolerating it
+    COUNT_STRATEGY: str = 'exact'
+    COUNT_CACHE_SIZE: int = 1024
+    COUNT_CACHE_TTL: int = 300
+    COUNT_ESTIMATE_THRESHOLD: int = 100000
+
+    # Rows per statement of CRUDBase.bulk_create/bulk_update/bulk_delete
+    BULK_CHUNK_SIZE: int = 1000
+
+    # Rows fetched per round-trip by CRUDBase.iter_all (dashboard exports)
+    EXPORT_YIELD_PER: int = 1000
+
+    # Full-text search: Postgres text search configuration and the number of words used from a query.
+    # The search_vector columns are generated with SEARCH_CONFIG when the 3_search_index migration runs,
+    # changing it afterwards needs them to be rebuilt
+    SEARCH_CONFIG: str = 'simple'
+    SEARCH_MAX_TERMS: int = 8
+
+    # Rendered anonymous pages (home page), keyed by path, language and Config version, 0 disables
+    PAGE_CACHE_SIZE: int = 256
+    PAGE_CACHE_TTL: int = 60
+
+    # Resolved users of AuthBackend, keyed by the token user_id
+    AUTH_USER_CACHE_SIZE: int = 1024
+    AUTH_USER_CACHE_TTL: int = 60
+
 
     LOCALE: Dict[str, Any] = {
         'DIR': 'locale'
@@ -99,12 +222,17 @@ class JWTSettings(BaseSettings):
     JWT_AUTH_HEADER_PREFIX: str = 'Bearer'
     # Helper functions
     JWT_PASSWORD_VERIFY: object = 'app.utils.security.verify_password'
+    JWT_PASSWORD_VERIFY_AND_UPDATE: object = 'app.utils.security.verify_and_update_password'
     JWT_PASSWORD_HANDLER: object = 'app.utils.security.get_password_hash'
     JWT_PAYLOAD_HANDLER: object = 'app.utils.security.jwt_payload'
+    # python-jose handlers, use app.utils.security.pyjwt_encode/pyjwt_decode for EdDSA
     JWT_ENCODE_HANDLER: object = 'app.utils.security.jwt_encode'
     JWT_DECODE_HANDLER: object = 'app.utils.security.jwt_decode'
     JWT_AUDIENCE: Any = None
     JWT_ISSUER: Any = None
+    # Verified token -> payload, entries never outlive the token `exp` (+ leeway)
+    JWT_DECODE_CACHE_SIZE: int = 1024
+    JWT_DECODE_CACHE_TTL: int = 300
 
     class Config:
         case_sensitive = True
@@ -11,4 +11,4 @@ class User(Base):
 
 class Email(Base):
     email = sa.Column(sa.String(255), unique=True, index=True, nullable=False)
-    is_active = sa.Column(sa.Boolean, default=False)
+    is_active = sa.Column(sa.Boolean, default=False, index=True)
@@ -1,39 +1,80 @@
-from typing import Optional, Union, Dict, Any
+from typing import Optional, Union, Dict, Any, List, Sequence
 
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.db.repository import CRUDBase
 from .models import User, Email
-from app.utils.security import lazy_jwt_settings
+from app.conf.config import settings
+from app.utils.cache import TTLCache
+from app.utils.security import lazy_jwt_settings, password_hasher
+
+user_cache = TTLCache(maxsize=settings.AUTH_USER_CACHE_SIZE, ttl=settings.AUTH_USER_CACHE_TTL)
 
 
 def convert_user_data(data: dict) -> dict:
     if data.get('password'):
-        hashed_password = lazy_jwt_settings.JWT_PASSWORD_HANDLER(data["password"])
+        hashed_password = password_hasher.call(lazy_jwt_settings.JWT_PASSWORD_HANDLER, data["password"])
+        del data["password"]
+        data["hashed_password"] = hashed_password
+    return data
+
+
+async def async_convert_user_data(data: dict) -> dict:
+    if data.get('password'):
+        hashed_password = await password_hasher.async_call(lazy_jwt_settings.JWT_PASSWORD_HANDLER, data["password"])
         del data["password"]
         data["hashed_password"] = hashed_password
     return data
 
 
 class CRUDUser(CRUDBase[User]):
+    filter_fields = ('id', 'email')
+
     def get_by_email(self, db: Session, *, email: str) -> Optional[User]:
         return db.query(User).filter(User.email == email).first()
 
+    async def async_get_by_email(self, db: AsyncSession, *, email: str) -> Optional[User]:
+        stmt = select(User).filter(User.email == email).limit(1)
+        return (await db.execute(stmt)).scalars().first()
+
     def create(self, db: Session, *, obj_in: Union[dict,], ) -> Optional[User]:
         data_in = convert_user_data(obj_in)
         db_obj = self.model(**data_in)  # type: ignore
         db.add(db_obj)
         db.commit()
-        db.refresh(db_obj)
         return db_obj
 
     def authenticate(self, db: Session, *, email: str, password: str) -> Optional[User]:
         user_db: User = self.get_by_email(db, email=email, )
         if not user_db:
             return None
-        check_pass = lazy_jwt_settings.JWT_PASSWORD_VERIFY(password, user_db.hashed_password)
+        check_pass, new_hash = password_hasher.call(
+            lazy_jwt_settings.JWT_PASSWORD_VERIFY_AND_UPDATE, password, user_db.hashed_password,
+        )
+        if not check_pass:
+            return None
+        if new_hash:
+            user_id = user_db.id
+            user_db = super().update(db, db_obj=user_db, obj_in={'hashed_password': new_hash})
+            user_cache.delete(user_id)
+        return user_db
+
+    async def async_authenticate(self, db: AsyncSession, *, email: str, password: str) -> Optional[User]:
+        user_db: User = await self.async_get_by_email(db, email=email, )
+        if not user_db:
+            return None
+        check_pass, new_hash = await password_hasher.async_call(
+            lazy_jwt_settings.JWT_PASSWORD_VERIFY_AND_UPDATE, password, user_db.hashed_password,
+        )
         if not check_pass:
             return None
+        if new_hash:
+            # Hashing parameters changed since the password was stored, upgrade it while we know it
+            user_id = user_db.id
+            user_db = await super().async_update(db, db_obj=user_db, obj_in={'hashed_password': new_hash})
+            user_cache.delete(user_id)
         return user_db
 
     def update(
@@ -43,11 +84,80 @@ class CRUDUser(CRUDBase[User]):
             obj_in: Dict[str, Any],
     ) -> User:
         data_in = convert_user_data(obj_in)
-        return super().update(db, db_obj=db_obj, obj_in=data_in)
+        # Evicted once committed, a concurrent read before the commit would cache the old row again
+        user_id = db_obj.id
+        user = super().update(db, db_obj=db_obj, obj_in=data_in)
+        user_cache.delete(user_id)
+        return user
+
+    def delete(self, db: Session, *, db_obj: User, ) -> User:
+        user_id = db_obj.id
+        user = super().delete(db, db_obj=db_obj)
+        user_cache.delete(user_id)
+        return user
+
+    async def async_create(self, db: AsyncSession, *, obj_in: Union[dict,], ) -> Optional[User]:
+        data_in = await async_convert_user_data(obj_in)
+        return await super().async_create(db, obj_in=data_in)
+
+    async def async_update(
+            self, db: AsyncSession,
+            *,
+            db_obj: User,
+            obj_in: Dict[str, Any],
+    ) -> User:
+        data_in = await async_convert_user_data(obj_in)
+        user_id = db_obj.id
+        user = await super().async_update(db, db_obj=db_obj, obj_in=data_in)
+        user_cache.delete(user_id)
+        return user
+
+    async def async_delete(self, db: AsyncSession, *, db_obj: User, ) -> User:
+        user_id = db_obj.id
+        user = await super().async_delete(db, db_obj=db_obj)
+        user_cache.delete(user_id)
+        return user
+
+    def bulk_create(self, db: Session, *, objs_in: Sequence[dict], chunk_size: Optional[int] = None) -> List[int]:
+        return super().bulk_create(db, objs_in=[convert_user_data(dict(obj)) for obj in objs_in], chunk_size=chunk_size)
+
+    def bulk_update(self, db: Session, *, objs_in: Union[Sequence[dict], dict], **kwargs) -> int:
+        if isinstance(objs_in, dict):
+            objs_in = convert_user_data(dict(objs_in))
+        else:
+            objs_in = [convert_user_data(dict(obj)) for obj in objs_in]
+        total = super().bulk_update(db, objs_in=objs_in, **kwargs)
+        user_cache.clear()
+        return total
+
+    def bulk_delete(self, db: Session, **kwargs) -> int:
+        total = super().bulk_delete(db, **kwargs)
+        user_cache.clear()
+        return total
+
+    async def async_bulk_create(
+            self, db: AsyncSession, *, objs_in: Sequence[dict], chunk_size: Optional[int] = None,
+    ) -> List[int]:
+        objs_in = [await async_convert_user_data(dict(obj)) for obj in objs_in]
+        return await super().async_bulk_create(db, objs_in=objs_in, chunk_size=chunk_size)
+
+    async def async_bulk_update(self, db: AsyncSession, *, objs_in: Union[Sequence[dict], dict], **kwargs) -> int:
+        if isinstance(objs_in, dict):
+            objs_in = await async_convert_user_data(dict(objs_in))
+        else:
+            objs_in = [await async_convert_user_data(dict(obj)) for obj in objs_in]
+        total = await super().async_bulk_update(db, objs_in=objs_in, **kwargs)
+        user_cache.clear()
+        return total
+
+    async def async_bulk_delete(self, db: AsyncSession, **kwargs) -> int:
+        total = await super().async_bulk_delete(db, **kwargs)
+        user_cache.clear()
+        return total
 
 
 class CRUDEmail(CRUDBase[Email]):
-    pass
+    filter_fields = ('id', 'email', 'is_active')
 
 
 user_repo = CRUDUser(User)
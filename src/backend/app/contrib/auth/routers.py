@@ -1,15 +1,16 @@
 from typing import Optional
 from fastapi import APIRouter, Request, Form, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette_i18n import gettext_lazy as _
 from fastapi.responses import RedirectResponse, HTMLResponse
 from starlette.authentication import BaseUser
-from starlette.status import HTTP_303_SEE_OTHER, HTTP_302_FOUND
+from starlette.status import HTTP_303_SEE_OTHER, HTTP_302_FOUND, HTTP_503_SERVICE_UNAVAILABLE
 
 from app.conf.config import settings, cookies_settings
 from app.contrib.auth.forms import LoginForm
 from app.contrib.auth.repository import user_repo
-from app.routers.dependency import get_db, get_current_user
+from app.routers.dependency import get_async_db, get_current_user
+from app.utils.executors import ExecutorBusy
 from app.utils.security import lazy_jwt_settings
 from app.utils.templating import templates, flash
 from .models import User
@@ -43,10 +44,10 @@ def sign_in_user(
 
 
 @router.post('/login/', response_class=RedirectResponse, name='login')
-def login(
+async def login(
         request: Request,
         next_url: Optional[str] = settings.LOGIN_REDIRECT,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         email: str = Form(...),
         password: str = Form(...),
         user_req: BaseUser = Depends(get_current_user),
@@ -70,9 +71,20 @@ def login(
         password=password
     )
     if form.validate():
-        user = user_repo.authenticate(
-            db=db, email=email, password=password
-        )
+        try:
+            user = await user_repo.async_authenticate(
+                db=db, email=email, password=password
+            )
+        except ExecutorBusy:
+            form.email.errors = [_('Too many login attempts, please try again later')]
+            return templates.TemplateResponse(
+                'dashboard/auth/login.html',
+                context={
+                    'request': request, 'title': _('Login'), 'form': form
+                },
+                status_code=HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '1'},
+            )
         if not user:
             form.email.errors = [_('Incorrect email or password')]
             return templates.TemplateResponse(
@@ -1,6 +1,7 @@
 import sqlalchemy as sa
 
 from app.db.models import Base
+from app.db.search import SearchIndex
 
 
 class Post(Base):
@@ -10,3 +11,6 @@ class Post(Base):
 
     created_at = sa.Column(sa.DateTime(timezone=True), server_default=sa.func.now())
     updated_at = sa.Column(sa.DateTime(timezone=True), onupdate=sa.func.now(), )
+
+
+post_search = SearchIndex(Post.__table__, ('title', 'content'))
@@ -4,7 +4,7 @@ from .models import Post
 
 
 class CRUDPost(CRUDBase[Post]):
-    pass
+    filter_fields = ('id', 'slug', 'created_at')
 
 
 post_repo = CRUDPost(Post)
@@ -14,3 +14,6 @@ class Config(Base):
 
     address = sa.Column(sa.String(length=255),  default='')
     location = sa.Column(sa.String(length=255),  default='')
+
+    # Bumped on every update, lets other workers notice their cached copy is stale
+    version = sa.Column(sa.Integer, nullable=False, default=1, server_default='1')
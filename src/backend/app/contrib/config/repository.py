@@ -1,10 +1,73 @@
-from app.db.repository import CRUDBase
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
+from app.conf.config import settings
+from app.db.repository import CRUDBase
 from .models import Config
 
 
 class CRUDConfig(CRUDBase[Config]):
-    pass
+    def __init__(self, model):
+        super().__init__(model)
+        self._cached: Optional[Config] = None
+        self._checked_at = 0.0
+
+    def _cache(self, db, config: Config) -> Config:
+        # Detach the row so it can be shared by requests of every session
+        db.expunge(config)
+        self._cached = config
+        self._checked_at = time.monotonic()
+        return config
+
+    def _is_fresh(self) -> bool:
+        return time.monotonic() - self._checked_at < settings.CONFIG_CACHE_RECHECK
+
+    def _version_stmt(self, cached: Config):
+        return select(Config.version).where(Config.id == cached.id)
+
+    def _mark_checked(self) -> None:
+        self._checked_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        self._cached = None
+
+    def get_solo(self, db: Session) -> Config:
+        """
+        Process wide cached singleton row, created when missing. Once CONFIG_CACHE_RECHECK seconds
+        have passed, only the version stamp is read to detect updates made by other workers
+        """
+        cached = self._cached
+        if cached is not None:
+            if self._is_fresh():
+                return cached
+            if db.execute(self._version_stmt(cached)).scalar() == cached.version:
+                self._mark_checked()
+                return cached
+        config = self.get_by_params(db, {}) or self.create(db, obj_in={})
+        return self._cache(db, config)
+
+    async def async_get_solo(self, db: AsyncSession) -> Config:
+        cached = self._cached
+        if cached is not None:
+            if self._is_fresh():
+                return cached
+            if (await db.execute(self._version_stmt(cached))).scalar() == cached.version:
+                self._mark_checked()
+                return cached
+        config = await self.async_get_by_params(db, {}) or await self.async_create(db, obj_in={})
+        return self._cache(db, config)
+
+    def update(self, db: Session, *, db_obj: Config, obj_in: Dict[str, Any]) -> Config:
+        self.invalidate()
+        return super().update(db, db_obj=db_obj, obj_in=dict(obj_in, version=Config.version + 1))
+
+    async def async_update(self, db: AsyncSession, *, db_obj: Config, obj_in: Dict[str, Any]) -> Config:
+        self.invalidate()
+        return await super().async_update(db, db_obj=db_obj, obj_in=dict(obj_in, version=Config.version + 1))
 
 
 config_repo = CRUDConfig(Config)
@@ -0,0 +1,37 @@
+from typing import Any, Dict
+
+from app.contrib.auth.repository import email_repo
+from app.contrib.outbox.handlers import handler
+from app.db.session import SessionLocal
+from app.utils.emails import send_contact_us_messages
+from .models import DELIVERY_SENT, Message
+from .repository import CONTACT_US_JOB, delivery_repo
+
+
+@handler(CONTACT_US_JOB)
+def send_contact_us(payload: Dict[str, Any]) -> None:
+    """
+    Notify the active recipients that did not get the message yet, the job is retried
+    by the outbox worker as long as some of them fail
+    """
+    with SessionLocal() as db:
+        # Session.get reads the primary, a replica may not have the message yet
+        message = db.get(Message, payload['message_id'])
+        if message is None:
+            return
+        delivered = {
+            delivery.email for delivery in delivery_repo.get_for_message(db, message_id=message.id)
+            if delivery.status == DELIVERY_SENT
+        }
+        emails_to = [
+            row.email for row in email_repo.get_all(db, q={'is_active': True}, limit=None, columns=('email',))
+            if row.email not in delivered
+        ]
+    if not emails_to:
+        return
+    results = send_contact_us_messages(message, emails_to)
+    with SessionLocal() as db:
+        delivery_repo.record(db, message_id=message.id, results=results)
+    failed = [email for email, error in results.items() if error]
+    if failed:
+        raise RuntimeError(f'SMTP delivery failed for {len(failed)} of {len(results)} recipients')
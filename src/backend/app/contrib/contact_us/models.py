@@ -1,6 +1,7 @@
 import sqlalchemy as sa
 
 from app.db.models import Base
+from app.db.search import SearchIndex
 
 
 class Message(Base):
@@ -12,4 +13,33 @@ class Message(Base):
     body = sa.Column(sa.Text(), default='', nullable=False)
 
     created_at = sa.Column(sa.DateTime(timezone=True), server_default=sa.func.now())
-    updated_at = sa.Column(sa.DateTime(timezone=True), onupdate=sa.func.now(), )
\ No newline at end of file
+    updated_at = sa.Column(sa.DateTime(timezone=True), onupdate=sa.func.now(), )
+
+    __table_args__ = (
+        # Newest first listing, keyset pagination and date range exports
+        sa.Index('ix_message_created_at_id', 'created_at', 'id'),
+    )
+
+
+message_search = SearchIndex(Message.__table__, ('title', 'body', 'fullname', 'email'))
+
+
+DELIVERY_SENT = 'sent'
+DELIVERY_FAILED = 'failed'
+
+
+class MessageDelivery(Base):
+    """
+    Notification of a message to one recipient, failed ones are retried by the outbox job
+    """
+    message_id = sa.Column(sa.Integer, sa.ForeignKey('message.id', ondelete='CASCADE'), nullable=False)
+    email = sa.Column(sa.String(255), nullable=False)
+    status = sa.Column(sa.String(16), nullable=False)
+    attempts = sa.Column(sa.Integer, nullable=False, default=0)
+    last_error = sa.Column(sa.Text(), nullable=True)
+
+    updated_at = sa.Column(sa.DateTime(timezone=True), server_default=sa.func.now(), onupdate=sa.func.now())
+
+    __table_args__ = (
+        sa.UniqueConstraint('message_id', 'email', name='uq_messagedelivery_message_id_email'),
+    )
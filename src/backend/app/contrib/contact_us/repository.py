@@ -1,9 +1,81 @@
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.contrib.outbox.repository import outbox_repo
+from app.db.pagination import bind_value
 from app.db.repository import CRUDBase
-from .models import Message
+from .models import DELIVERY_FAILED, DELIVERY_SENT, Message, MessageDelivery
+
+# Outbox job notifying the site recipients of a new message, handled by .jobs
+CONTACT_US_JOB = 'contact_us'
+EXPORT_FIELDS = ('id', 'fullname', 'company_name', 'email', 'phone_number', 'title', 'body', 'created_at')
 
 
 class CRUDMessage(CRUDBase[Message]):
-    pass
+    filter_fields = ('id', 'email', 'created_at')
+
+    def create_with_notification(self, db: Session, *, obj_in: dict) -> Message:
+        """
+        Create the message and queue its notification in the same transaction
+        """
+        db_obj = self.model(**jsonable_encoder(obj_in))
+        db.add(db_obj)
+        db.flush()
+        outbox_repo.enqueue(db, kind=CONTACT_US_JOB, payload={'message_id': db_obj.id}, commit=False)
+        db.commit()
+        return db_obj
+
+    def iter_export(
+            self, db: Session, *, date_from: Optional[date] = None, date_to: Optional[date] = None,
+    ) -> Iterator:
+        """
+        Stream messages created between `date_from` and `date_to` (both inclusive) in creation order
+        """
+        dialect_name = db.get_bind().dialect.name
+        where = []
+        if date_from:
+            where.append(Message.created_at >= bind_value(
+                Message.created_at, datetime.combine(date_from, time.min), dialect_name,
+            ))
+        if date_to:
+            where.append(Message.created_at < bind_value(
+                Message.created_at, datetime.combine(date_to + timedelta(days=1), time.min), dialect_name,
+            ))
+        return self.iter_all(
+            db, where=where, columns=EXPORT_FIELDS, order_by=(Message.created_at, Message.id),
+        )
+
+
+class CRUDMessageDelivery(CRUDBase[MessageDelivery]):
+
+    def get_for_message(self, db: Session, *, message_id: int) -> List[MessageDelivery]:
+        stmt = select(MessageDelivery).where(MessageDelivery.message_id == message_id).order_by(MessageDelivery.email)
+        return db.execute(stmt).scalars().all()
+
+    def record(self, db: Session, *, message_id: int, results: Dict[str, Optional[str]]) -> List[MessageDelivery]:
+        """
+        Store the outcome of one send attempt per recipient
+        :param db:
+        :param message_id:
+        :param results: error per recipient, None for the delivered ones
+        :return:
+        """
+        deliveries = {delivery.email: delivery for delivery in self.get_for_message(db, message_id=message_id)}
+        for email, error in results.items():
+            delivery = deliveries.get(email)
+            if delivery is None:
+                delivery = deliveries[email] = self.model(message_id=message_id, email=email, attempts=0)
+                db.add(delivery)
+            delivery.attempts += 1
+            delivery.status = DELIVERY_FAILED if error else DELIVERY_SENT
+            delivery.last_error = error
+        db.commit()
+        return list(deliveries.values())
 
 
 message_repo = CRUDMessage(Message)
+delivery_repo = CRUDMessageDelivery(MessageDelivery)
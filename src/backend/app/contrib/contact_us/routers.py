@@ -1,6 +1,6 @@
 from typing import Optional, Union
 from starlette.status import HTTP_302_FOUND
-from fastapi import APIRouter, Depends, Request, Form, BackgroundTasks
+from fastapi import APIRouter, Depends, Request, Form
 from sqlalchemy.orm import Session
 from fastapi.responses import HTMLResponse, RedirectResponse
 from starlette_i18n import gettext_lazy as _
@@ -8,7 +8,6 @@ from app.utils.templating import templates, flash
 from .forms import ContactUsForm
 from .repository import message_repo
 from app.routers.dependency import get_db
-from app.utils.emails import send_contact_us_messages
 
 router = APIRouter()
 
@@ -17,7 +16,6 @@ router = APIRouter()
 def contact_us(
         request: Request,
 
-        background_tasks: BackgroundTasks,
         fullname: str = Form(...),
         email: str = Form(...),
         title: str = Form(...),
@@ -36,8 +34,8 @@ def contact_us(
     }
     form = ContactUsForm(data=data)
     if form.validate():
-        message = message_repo.create(db=db, obj_in=data)
-        background_tasks.add_task(send_contact_us_messages, message, )
+        # Mailed by the outbox worker, SMTP never runs inside the web worker
+        message_repo.create_with_notification(db=db, obj_in=data)
         flash(request, str(_('Message successfully sent')))
         return RedirectResponse(request.url_for('home-page'), status_code=HTTP_302_FOUND)
     return templates.TemplateResponse(
@@ -1,7 +1,8 @@
+from datetime import date
 from typing import Optional, Union
 
-from fastapi import APIRouter, Request, Depends, Form
-from fastapi.responses import RedirectResponse, HTMLResponse
+from fastapi import APIRouter, Request, Depends, Form, Query
+from fastapi.responses import RedirectResponse, HTMLResponse, StreamingResponse
 from slugify import slugify
 from starlette.datastructures import FormData
 from starlette_i18n import gettext_lazy as _
@@ -11,13 +12,19 @@ from starlette.status import HTTP_302_FOUND
 from app.contrib.blog.forms import PostForm
 from app.contrib.blog.repository import post_repo
 from app.contrib.config.repository import config_repo
-from app.contrib.contact_us.repository import message_repo
+from app.contrib.contact_us.repository import delivery_repo, message_repo, EXPORT_FIELDS as MESSAGE_EXPORT_FIELDS
 from app.contrib.dashboard.forms import ConfigForm, UserForm, UserUpdateForm, EmailForm
 from app.routers.dependency import get_db, get_authenticated_user, get_commons
 from app.contrib.auth.models import User
 from app.utils.templating import templates, flash
 from app.conf.config import settings
-from app.contrib.auth.repository import user_repo, email_repo
+from app.contrib.auth.repository import user_repo, email_repo, user_cache
+from app.db.counts import count_cache
+from app.db.pagination import Page
+from app.db.session import SessionLocal, async_replicas, pool_counters, replicas
+from app.utils.export import EXPORT_FORMATS
+from app.utils.page_cache import page_cache
+from app.utils.security import jwt_decode_cache, password_hasher, password_verify_seconds
 
 router = APIRouter()
 
@@ -37,6 +44,31 @@ def get_admin_page(
     )
 
 
+@router.get('/metrics/', name='metrics')
+def get_metrics(
+        user: User = Depends(get_authenticated_user),
+) -> dict:
+    """
+    Runtime counters of the worker process
+    """
+    return {
+        'pools': {name: counter.dict() for name, counter in pool_counters.items()},
+        'replicas': {'sync': replicas.status(), 'async': async_replicas.status()},
+        'executors': {
+            'password_hasher': password_hasher.stats(),
+        },
+        'histograms': {
+            'password_verify_seconds': password_verify_seconds.dict(),
+        },
+        'caches': {
+            'auth_user': user_cache.stats(),
+            'jwt_decode': jwt_decode_cache.stats(),
+            'page': page_cache.cache.stats(),
+            'count': count_cache.stats(),
+        },
+    }
+
+
 @router.get('/user/', response_class=HTMLResponse, name='user-list-page')
 def get_users(
         request: Request,
@@ -46,9 +78,10 @@ def get_users(
 ) -> HTMLResponse:
     limit = commons.get('limit', settings.PAGINATION_MAX_SIZE)
     offset = commons.get('offset', 0)
-    q = commons.get('q')
+    q = user_repo.clean_filters(commons.get('q'))
 
-    object_list = user_repo.get_all(db=db, q=q, limit=limit, offset=offset)
+    object_list = user_repo.get_all(db=db, q=q, limit=limit, offset=offset, columns=('id', 'email'),
+                                    order_by=user_repo.clean_order_by(commons.get('order_by')))
     total = user_repo.count(db, q=q)
     return templates.TemplateResponse(
         'dashboard/auth/user/list_view.html',
@@ -216,10 +249,11 @@ def get_emails(
 ) -> HTMLResponse:
     limit = commons.get('limit', settings.PAGINATION_MAX_SIZE)
     offset = commons.get('offset', 0)
-    q = commons.get('q')
+    q = email_repo.clean_filters(commons.get('q'))
 
-    object_list = email_repo.get_all(db=db, q=q, limit=limit, offset=offset)
-    total = message_repo.count(db, q=q)
+    object_list = email_repo.get_all(db=db, q=q, limit=limit, offset=offset,
+                                     order_by=email_repo.clean_order_by(commons.get('order_by')))
+    total = email_repo.count(db, q=q)
 
     return templates.TemplateResponse(
         'dashboard/auth/email/list_view.html',
@@ -371,7 +405,7 @@ def delete_email(
         return response
     else:
         flash(request, str(_('Email successfully deleted')))
-        user_repo.delete(db, db_obj=obj)
+        email_repo.delete(db, db_obj=obj)
     return response
 
 
@@ -383,12 +417,16 @@ def get_messages(
         db: Session = Depends(get_db),
 ) -> HTMLResponse:
     limit = commons.get('limit', settings.PAGINATION_MAX_SIZE)
-    offset = commons.get('offset', 0)
-    q = commons.get('q')
+    q = message_repo.clean_filters(commons.get('q'))
 
-    object_list = message_repo.get_all(db=db, q=q, limit=limit, offset=offset,
-                                       order_by=(message_repo.model.created_at.desc(),))
-    total = message_repo.count(db, q=q)
+    columns = ('id', 'title', 'email', 'created_at')
+    if commons.get('search'):
+        page = Page(message_repo.search(db, commons['search'], q=q, limit=limit, columns=columns), None, None)
+    else:
+        page = message_repo.get_page(db=db, q=q, limit=limit, cursor=commons.get('cursor'),
+                                     order_by=message_repo.clean_order_by(commons.get('order_by'))
+                                     or (message_repo.model.created_at.desc(),),
+                                     columns=columns)
 
     return templates.TemplateResponse(
         'dashboard/message/list_view.html',
@@ -396,13 +434,39 @@ def get_messages(
             'request': request,
             'title': _('Messages'),
             'limit': limit,
-            'page': commons.get('page', 1),
-            'total': total,
-            'object_list': object_list,
+            'next_cursor': page.next_cursor,
+            'prev_cursor': page.prev_cursor,
+            'object_list': page.items,
         }
     )
 
 
+def iter_message_export(export_format: str, date_from: Optional[date], date_to: Optional[date]):
+    # The session lives as long as the response body is streamed
+    writer, _media_type = EXPORT_FORMATS[export_format]
+    with SessionLocal() as db:
+        rows = message_repo.iter_export(db, date_from=date_from, date_to=date_to)
+        yield from writer(rows, MESSAGE_EXPORT_FIELDS)
+
+
+@router.get('/message/export/', response_class=StreamingResponse, name='message-export')
+def export_messages(
+        export_format: str = Query('csv', alias='format', regex='^(csv|ndjson)$'),
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        user: User = Depends(get_authenticated_user),
+) -> StreamingResponse:
+    """
+    Stream messages as CSV or NDJSON, memory use does not depend on the number of rows
+    """
+    filename = f'messages-{date.today():%Y%m%d}.{export_format}'
+    return StreamingResponse(
+        iter_message_export(export_format, date_from, date_to),
+        media_type=EXPORT_FORMATS[export_format][1],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+
 @router.get('/message/{obj_id}/detail/', response_class=HTMLResponse, name='message-detail-page')
 def get_message(
         request: Request,
@@ -419,6 +483,7 @@ def get_message(
         {
             'request': request,
             'object': message,
+            'deliveries': delivery_repo.get_for_message(db, message_id=message.id),
             'title': _('Message: %(model)s') % {'model': message.title},
         }
     )
@@ -430,10 +495,7 @@ def get_config(
         user: User = Depends(get_authenticated_user),
         db: Session = Depends(get_db),
 ) -> HTMLResponse:
-    config = config_repo.get_by_params(db=db, params={})
-    if not config:
-        flash(request, str(_('Config created')))
-        config = config_repo.create(db, obj_in={})
+    config = config_repo.get_solo(db)
 
     return templates.TemplateResponse(
         'dashboard/config/detail_view.html',
@@ -452,10 +514,7 @@ def config_update_page(
         user: User = Depends(get_authenticated_user),
         db: Session = Depends(get_db),
 ) -> HTMLResponse:
-    config = config_repo.get_by_params(db=db, params={})
-    if not config:
-        flash(request, str(_('Config created')), )
-        config = config_repo.create(db, obj_in={})
+    config = config_repo.get_solo(db)
     form = ConfigForm(obj=config)
     return templates.TemplateResponse(
         'dashboard/config/update_view.html',
@@ -524,10 +583,17 @@ def post_list_page(
 ) -> HTMLResponse:
     limit = commons.get('limit', settings.PAGINATION_MAX_SIZE)
     offset = commons.get('offset', 0)
-    q = commons.get('q')
+    q = post_repo.clean_filters(commons.get('q'))
 
-    object_list = post_repo.get_all(db=db, q=q, limit=limit, offset=offset)
-    total = post_repo.count(db, q=q)
+    columns = ('id', 'title', 'slug')
+    if commons.get('search'):
+        # Ranked matches, a single page
+        object_list = post_repo.search(db, commons['search'], q=q, limit=limit, columns=columns)
+        total = len(object_list)
+    else:
+        object_list = post_repo.get_all(db=db, q=q, limit=limit, offset=offset, columns=columns,
+                                        order_by=post_repo.clean_order_by(commons.get('order_by')))
+        total = post_repo.count(db, q=q)
     return templates.TemplateResponse(
         'dashboard/blog/list_view.html',
         {
@@ -653,7 +719,7 @@ def update_post(
     form_data = FormData(**data)
     form = PostForm(obj=post_in, formdata=form_data)
     if form.validate():
-        user_repo.update(db=db, db_obj=post_in, obj_in=data)
+        post_repo.update(db=db, db_obj=post_in, obj_in=data)
         flash(request, str(_('User successfully updated')))
         return RedirectResponse(request.url_for('post-detail-page', slug_in=post_in.slug), status_code=HTTP_302_FOUND)
 
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Request, Depends
 from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.utils.page_cache import page_cache
 from app.utils.templating import templates
-from app.routers.dependency import get_db
+from app.routers.dependency import get_async_db
 from app.contrib.contact_us.forms import ContactUsForm
 from app.contrib.config.repository import config_repo
 
@@ -11,16 +12,20 @@ router = APIRouter()
 
 
 @router.get('/', response_class=HTMLResponse, name='home-page')
-async def home_page(request: Request, db: Session = Depends(get_db)):
+async def home_page(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Home page
     """
-    config = config_repo.get_by_params(db, {})
-    if not config:
-        config = config_repo.create(db)
+    config = await config_repo.async_get_solo(db)
+    cacheable = page_cache.is_cacheable(request)
+    cache_key = page_cache.make_key(request, config.version)
+    if cacheable:
+        response = page_cache.get_response(request, cache_key)
+        if response is not None:
+            return response
 
     form = ContactUsForm()
-    return templates.TemplateResponse(
+    response = templates.TemplateResponse(
         'frontend/home/index.html',
         context={
             'request': request,
@@ -30,3 +35,6 @@ async def home_page(request: Request, db: Session = Depends(get_db)):
             'seo_description': config.seo_description or config.site_name,
         },
     )
+    if cacheable:
+        response = page_cache.store(request, cache_key, response)
+    return response
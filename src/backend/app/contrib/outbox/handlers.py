@@ -0,0 +1,24 @@
+from typing import Any, Callable, Dict
+
+__all__ = ('handlers', 'handler', 'get_handler')
+
+handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+
+
+def handler(kind: str):
+    """
+    Register the function run by the outbox worker for jobs of `kind`, it gets the job payload
+    """
+
+    def decorator(func):
+        handlers[kind] = func
+        return func
+
+    return decorator
+
+
+def get_handler(kind: str) -> Callable[[Dict[str, Any]], Any]:
+    try:
+        return handlers[kind]
+    except KeyError:
+        raise LookupError(f'No outbox handler registered for {kind!r}') from None
@@ -0,0 +1,31 @@
+from datetime import datetime, timezone
+
+import sqlalchemy as sa
+
+from app.db.models import Base
+
+STATUS_PENDING = 'pending'
+STATUS_FAILED = 'failed'
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class OutboxJob(Base):
+    # Handler name, see app.contrib.outbox.handlers
+    kind = sa.Column(sa.String(64), nullable=False)
+    payload = sa.Column(sa.JSON(), nullable=False, default=dict)
+
+    status = sa.Column(sa.String(16), nullable=False, default=STATUS_PENDING)
+    attempts = sa.Column(sa.Integer, nullable=False, default=0)
+    # Set from Python, not server side, so it compares with the worker clock in every dialect
+    available_at = sa.Column(sa.DateTime(timezone=True), nullable=False, default=utcnow)
+    last_error = sa.Column(sa.Text(), nullable=True)
+
+    created_at = sa.Column(sa.DateTime(timezone=True), server_default=sa.func.now())
+
+    __table_args__ = (
+        # Due pending jobs, in order
+        sa.Index('ix_outboxjob_status_available_at', 'status', 'available_at'),
+    )
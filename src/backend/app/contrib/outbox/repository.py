@@ -0,0 +1,76 @@
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.conf.config import settings
+from app.db.repository import CRUDBase
+from .models import OutboxJob, STATUS_FAILED, STATUS_PENDING, utcnow
+
+
+def get_retry_delay(attempts: int) -> int:
+    """
+    Exponential backoff in seconds after the `attempts`-th failed attempt
+    """
+    return min(settings.OUTBOX_RETRY_DELAY * 2 ** max(attempts - 1, 0), settings.OUTBOX_RETRY_MAX_DELAY)
+
+
+class CRUDOutbox(CRUDBase[OutboxJob]):
+
+    def enqueue(self, db: Session, *, kind: str, payload: Dict[str, Any], commit: bool = True) -> OutboxJob:
+        """
+        Add a job, pass `commit=False` to commit it together with the rows it refers to
+        :param db:
+        :param kind: registered handler name
+        :param payload: JSON serializable arguments of the handler
+        :param commit:
+        :return:
+        """
+        db_obj = self.model(kind=kind, payload=payload)
+        db.add(db_obj)
+        if commit:
+            db.commit()
+        return db_obj
+
+    def claim(self, db: Session, *, limit: Optional[int] = None, lease: Optional[int] = None) -> List[OutboxJob]:
+        """
+        Take up to `limit` due jobs and hide them from other workers for `lease` seconds, a job whose
+        worker died before completing or failing it becomes due again once the lease is over.
+        Postgres workers skip each other's locked rows, SQLite serializes them on the write lock
+        """
+        now = utcnow()
+        stmt = select(OutboxJob).where(
+            OutboxJob.status == STATUS_PENDING, OutboxJob.available_at <= now,
+        ).order_by(
+            OutboxJob.available_at, OutboxJob.id,
+        ).limit(limit or settings.OUTBOX_BATCH_SIZE).with_for_update(skip_locked=True)
+        jobs = db.execute(stmt).scalars().all()
+        available_at = now + timedelta(seconds=lease or settings.OUTBOX_LEASE)
+        for job in jobs:
+            job.attempts += 1
+            job.available_at = available_at
+        db.commit()
+        return jobs
+
+    def complete(self, db: Session, *, db_obj: OutboxJob) -> None:
+        """
+        Remove a finished job, committed right away so that it is not run again
+        """
+        db.delete(db_obj)
+        db.commit()
+
+    def fail(self, db: Session, *, db_obj: OutboxJob, error: str) -> OutboxJob:
+        """
+        Schedule the next attempt with exponential backoff, or give the job up after OUTBOX_MAX_ATTEMPTS
+        """
+        db_obj.last_error = error[:2000]
+        if db_obj.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            db_obj.status = STATUS_FAILED
+        else:
+            db_obj.available_at = utcnow() + timedelta(seconds=get_retry_delay(db_obj.attempts))
+        db.commit()
+        return db_obj
+
+
+outbox_repo = CRUDOutbox(OutboxJob)
@@ -13,8 +13,8 @@ from starlette_i18n import gettext_lazy as _
 from fastapi.security.utils import get_authorization_scheme_param
 from app.utils.security import lazy_jwt_settings
 from app.conf.config import cookies_settings
-from app.db.session import SessionLocal
-from app.contrib.auth.repository import user_repo
+from app.db.session import AsyncSessionLocal
+from app.contrib.auth.repository import user_repo, user_cache
 from app.contrib.auth.schema import TokenPayload
 
 
@@ -73,8 +73,13 @@ class AuthBackend(AuthenticationBackend):
                     detail=str(_('Could not validate credentials')),
                     headers={"WWW-Authenticate": "Bearer"},
                 )
-            db = SessionLocal()
-
-            user = user_repo.get_by_params(db, params={'id': token_data.user_id})
+            user = user_cache.get(token_data.user_id)
+            if user is None:
+                # Own short-lived session, released before the request reaches the endpoint
+                async with AsyncSessionLocal() as db:
+                    user = await user_repo.async_get_by_params(db, params={'id': token_data.user_id})
+                if not user:
+                    return None
+                user_cache.set(token_data.user_id, user)
             return AuthCredentials(["authenticated"]), SimpleUser(user)
         return None
@@ -14,3 +14,13 @@ class UnAuthenticated(HTTPException):
         if headers is None:
             headers = {"WWW-Authenticate": "Bearer"}
         super().__init__(status_code=status_code, detail=detail, headers=headers)
+
+
+class InvalidCursor(HTTPException):
+    def __init__(
+            self,
+            status_code: int = status.HTTP_400_BAD_REQUEST,
+            detail: Any = str(_('Invalid pagination cursor')),
+            headers: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        super().__init__(status_code=status_code, detail=detail, headers=headers)
@@ -14,7 +14,6 @@ class Unique(BaseUnique):
     def __call__(self, form, field):
         columns = self._syntaxes_as_tuples(form, field, self.column)
         self.model = columns[0][1].class_
-        query = self.query
         if not hasattr(form, '_obj'):
             raise Exception(
                 "Couldn't access Form._obj attribute. Either make your form "
@@ -22,16 +21,19 @@ class Unique(BaseUnique):
                 "ModelForm or make this attribute available in your form."
             )
 
-        for field_name, column in columns:
-            id_in = None
-            if form._obj:
-                id_in = getattr(form._obj, 'id')
-            exist = self.get_session().query(query.filter(column == form[field_name].data,
-                                                          self.model.id != id_in).exists()).scalar()
-            if exist:
-                if self.message is None:
-                    self.message = field.gettext(u'Already exists.')
-                raise ValidationError(self.message)
+        # get_session hands out a new session, close it so the connection goes back to the pool
+        with self.get_session() as session:
+            query = session.query(self.model)
+            for field_name, column in columns:
+                id_in = None
+                if form._obj:
+                    id_in = getattr(form._obj, 'id')
+                exist = session.query(query.filter(column == form[field_name].data,
+                                                   self.model.id != id_in).exists()).scalar()
+                if exist:
+                    if self.message is None:
+                        self.message = field.gettext(u'Already exists.')
+                    raise ValidationError(self.message)
 
 
 def check_phone_number(form, field):
@@ -1,6 +1,7 @@
 from .models import Base
 
 from app.contrib.auth.models import User, Email
-from app.contrib.contact_us.models import Message
+from app.contrib.contact_us.models import Message, MessageDelivery
 from app.contrib.config.models import Config
 from app.contrib.blog.models import Post
+from app.contrib.outbox.models import OutboxJob
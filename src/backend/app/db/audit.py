@@ -0,0 +1,120 @@
+"""
+Index audit of the queries issued by the repositories, run with
+
+    python -m app.db.audit [--strict]
+
+Every scenario runs the repository call against the configured database while its
+statements are recorded, then each statement is explained (EXPLAIN QUERY PLAN on SQLite,
+EXPLAIN on Postgres) and full table scans or sorts without an index are reported.
+With --strict the exit status is 1 when a problem is found
+"""
+import argparse
+import re
+import sys
+from contextlib import contextmanager
+from datetime import date, datetime
+from itertools import islice
+from typing import Callable, Iterator, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+import app.db  # noqa: F401, registers every model
+from app.contrib.auth.repository import email_repo, user_repo
+from app.contrib.blog.repository import post_repo
+from app.contrib.contact_us.models import Message
+from app.contrib.contact_us.repository import message_repo
+from app.db.filters import FilterError
+from app.db.pagination import decode_cursor, encode_cursor
+from app.db.session import SessionLocal
+
+# Plan lines pointing at a missing index
+SQLITE_PROBLEMS = (
+    re.compile(r'^SCAN (?!.*USING (COVERING )?INDEX)(?!.*VIRTUAL TABLE)'),
+    re.compile(r'USE TEMP B-TREE FOR ORDER BY'),
+)
+POSTGRESQL_PROBLEMS = (
+    re.compile(r'Seq Scan on'),
+    re.compile(r'Sort Key:'),
+)
+
+
+def get_scenarios() -> List[Tuple[str, Callable[[Session], object]]]:
+    newest_first = (Message.created_at.desc(),)
+    deep_cursor = decode_cursor(encode_cursor([datetime(2000, 1, 1), 1]))
+    return [
+        ('message list, first page', lambda db: message_repo.get_page(db, order_by=newest_first)),
+        ('message list, next page', lambda db: message_repo.get_page(db, order_by=newest_first, cursor=deep_cursor)),
+        ('message export, date range', lambda db: list(islice(message_repo.iter_export(
+            db, date_from=date(2000, 1, 1), date_to=date(2000, 12, 31)), 10))),
+        ('active notification emails', lambda db: email_repo.get_all(db, q={'is_active': True})),
+        ('post by slug', lambda db: post_repo.get_by_params(db, {'slug': 'audit'})),
+        ('user by email', lambda db: user_repo.get_by_email(db, email='audit@example.com')),
+    ]
+
+
+@contextmanager
+def record_statements(db: Session) -> Iterator[List[Tuple[str, object]]]:
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    bind = db.get_bind()
+    event.listen(bind, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(bind, 'before_cursor_execute', before_cursor_execute)
+
+
+def explain(connection: Connection, statement: str, parameters) -> List[str]:
+    if connection.dialect.name == 'sqlite':
+        return [row[-1] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+    return [row[0] for row in connection.exec_driver_sql('EXPLAIN ' + statement, parameters)]
+
+
+def find_problems(dialect_name: str, plan: List[str]) -> List[str]:
+    patterns = SQLITE_PROBLEMS if dialect_name == 'sqlite' else POSTGRESQL_PROBLEMS
+    return [line.strip() for line in plan if any(pattern.search(line.strip()) for pattern in patterns)]
+
+
+def audit(db: Session) -> int:
+    connection = db.connection()
+    problems = 0
+    for name, scenario in get_scenarios():
+        print(f'== {name}')
+        with record_statements(db) as statements:
+            try:
+                scenario(db)
+            except FilterError as e:
+                problems += 1
+                print(f'   !! {e}')
+        for statement, parameters in statements:
+            if not statement.lstrip().upper().startswith('SELECT'):
+                continue
+            plan = explain(connection, statement, parameters)
+            found = find_problems(connection.dialect.name, plan)
+            problems += len(found)
+            print('   ' + ' '.join(statement.split())[:160])
+            for line in plan:
+                print(f"   {'!!' if line.strip() in found else '  '} {line}")
+    print(f'{problems} problem(s) found')
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--strict', action='store_true', help='Exit with status 1 when a problem is found')
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        problems = audit(db)
+        db.rollback()
+    if args.strict and problems:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import bindparam, delete, insert, update
+
+from app.conf.config import settings
+from .filters import get_filter_clauses
+
+# Bind parameter limit of SQLite builds older than 3.32
+SQLITE_MAX_VARIABLES = 999
+
+
+def chunked(items: Sequence[Any], size: int) -> Iterator[Sequence[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def get_chunk_size(dialect, n_params: int, chunk_size: Optional[int]) -> int:
+    """
+    Rows per statement, kept under the bind parameter limit of SQLite
+    """
+    chunk_size = chunk_size or settings.BULK_CHUNK_SIZE
+    if dialect.name == 'sqlite':
+        chunk_size = min(chunk_size, max(SQLITE_MAX_VARIABLES // max(n_params, 1), 1))
+    return chunk_size
+
+
+def bulk_insert_stmt(model, rows: List[Dict[str, Any]], dialect):
+    """
+    One multi-row INSERT ... VALUES, with RETURNING of the primary keys where the dialect has it
+    """
+    table = model.__table__
+    stmt = insert(table).values(rows)
+    if dialect.full_returning:
+        stmt = stmt.returning(table.c.id)
+    return stmt
+
+
+def has_mixed_ids(rows: List[Dict[str, Any]]) -> bool:
+    explicit = [row.get('id') is not None for row in rows]
+    return any(explicit) and not all(explicit)
+
+
+def bulk_insert_chunks(rows: List[Dict[str, Any]], dialect, chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Rows per INSERT, without RETURNING a chunk where only some rows name their `id` is inserted row by row,
+    the generated rowids would not be consecutive
+    """
+    for chunk in chunked(rows, chunk_size):
+        if not dialect.full_returning and has_mixed_ids(chunk):
+            for row in chunk:
+                yield [row]
+        else:
+            yield chunk
+
+
+def get_inserted_ids(result, rows: List[Dict[str, Any]], dialect) -> List[int]:
+    if dialect.full_returning:
+        return list(result.scalars().all())
+    if rows[0].get('id') is not None:
+        # Every row of the statement names its id (see bulk_insert_chunks)
+        return [row['id'] for row in rows]
+    # SQLite: the write lock is held until commit and rowids of one INSERT are assigned
+    # consecutively, so the statement's rows end at lastrowid
+    return list(range(result.lastrowid - len(rows) + 1, result.lastrowid + 1))
+
+
+def bulk_update_by_pk_stmt(model, keys: Sequence[str]):
+    """
+    UPDATE executed with executemany, every row carries its own `id` and values
+    """
+    table = model.__table__
+    return update(table).where(table.c.id == bindparam('_pk')).values(
+        {key: bindparam(key) for key in keys}
+    )
+
+
+def bulk_update_params(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    params = []
+    for row in rows:
+        row = dict(row)
+        row['_pk'] = row.pop('id')
+        params.append(row)
+    return params
+
+
+def filter_stmt(stmt, model, ids: Optional[Sequence[Any]], q: Optional[dict]):
+    if ids is not None:
+        stmt = stmt.where(model.__table__.c.id.in_(ids))
+    # Maintenance code is trusted, the filter DSL is accepted on any column here
+    return stmt.where(*get_filter_clauses(model, q))
+
+
+def bulk_update_stmt(model, values: Dict[str, Any], ids: Optional[Sequence[Any]], q: Optional[dict]):
+    return filter_stmt(update(model.__table__), model, ids, q).values(values)
+
+
+def bulk_delete_stmt(model, ids: Optional[Sequence[Any]], q: Optional[dict]):
+    return filter_stmt(delete(model.__table__), model, ids, q)
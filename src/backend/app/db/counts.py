@@ -0,0 +1,98 @@
+from collections import defaultdict
+from itertools import chain
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple
+
+import sqlalchemy as sa
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.conf.config import settings
+from app.utils.cache import TTLCache
+
+COUNT_EXACT = 'exact'
+COUNT_CACHED = 'cached'
+COUNT_ESTIMATED = 'estimated'
+
+# Row estimates kept up to date by ANALYZE / autovacuum, no table scan involved
+ESTIMATE_SQL = {
+    'postgresql': sa.text('SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)'),
+    # The first number of each stat row is the row count of the table, sqlite_stat1 exists after ANALYZE
+    'sqlite': sa.text('SELECT max(CAST(stat AS INTEGER)) FROM sqlite_stat1 WHERE tbl = :table'),
+}
+
+count_cache = TTLCache(maxsize=settings.COUNT_CACHE_SIZE, ttl=settings.COUNT_CACHE_TTL)
+
+# Bumped when a session of this process commits ORM or CRUDBase bulk writes to a table, cached counts
+# of older generations are not read again here. Writes of other processes and other Core statements
+# are not seen, their stale counts live until COUNT_CACHE_TTL expires
+_generations: Dict[str, int] = defaultdict(int)
+
+
+def count_stmt(model, clauses: Sequence[Any] = ()):
+    return select(func.count()).select_from(model).where(*clauses)
+
+
+def count_cache_key(model, q: Optional[dict] = None) -> Tuple[Hashable, ...]:
+    table_name = model.__table__.name
+    return table_name, _generations[table_name], tuple(sorted((k, repr(v)) for k, v in (q or {}).items()))
+
+
+def invalidate_counts(*table_names: str) -> None:
+    for table_name in table_names:
+        _generations[table_name] += 1
+
+
+def mark_tables_written(session: Session, *table_names: str) -> None:
+    """
+    Invalidate the counts of tables written with Core statements once the session commits
+    """
+    session.info.setdefault('count_tables', set()).update(table_names)
+
+
+def estimate_stmt(dialect_name: str):
+    return ESTIMATE_SQL.get(dialect_name)
+
+
+def parse_estimate(value) -> Optional[int]:
+    # reltuples is -1 for a table that has never been analyzed
+    if value is None or value < 0:
+        return None
+    return int(value)
+
+
+def get_estimated_count(db: Session, model) -> Optional[int]:
+    stmt = estimate_stmt(db.get_bind().dialect.name)
+    if stmt is None:
+        return None
+    try:
+        return parse_estimate(db.execute(stmt, {'table': model.__table__.name}).scalar())
+    except OperationalError:
+        return None
+
+
+async def async_get_estimated_count(db, model) -> Optional[int]:
+    stmt = estimate_stmt(db.bind.dialect.name)
+    if stmt is None:
+        return None
+    try:
+        return parse_estimate((await db.execute(stmt, {'table': model.__table__.name})).scalar())
+    except OperationalError:
+        return None
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_flushed_tables(session, flush_context) -> None:
+    tables = session.info.setdefault('count_tables', set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        tables.add(sa.inspect(obj).mapper.local_table.name)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_tables(session) -> None:
+    invalidate_counts(*session.info.pop('count_tables', ()))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_flushed_tables(session) -> None:
+    session.info.pop('count_tables', None)
@@ -0,0 +1,152 @@
+import operator
+from datetime import date, datetime
+from typing import Any, Iterable, List, Optional, Sequence, Set
+
+import sqlalchemy as sa
+from sqlalchemy.sql.elements import ColumnElement
+
+LOOKUP_SEPARATOR = '__'
+
+RANGE_LOOKUPS = {
+    'gt': operator.gt,
+    'gte': operator.ge,
+    'lt': operator.lt,
+    'lte': operator.le,
+}
+LOOKUPS = ('exact', 'prefix', 'in', 'isnull', *RANGE_LOOKUPS)
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+FALSE_VALUES = ('0', 'false', 'no', 'off')
+
+
+class FilterError(ValueError):
+    pass
+
+
+def get_indexed_columns(table: sa.Table) -> Set[str]:
+    """
+    Columns a lookup can be served from an index for: primary key, unique or indexed columns
+    and the leading column of every index or unique constraint
+    """
+    names = {column.name for column in table.primary_key.columns}
+    names.update(column.name for column in table.columns if column.index or column.unique)
+    for index in table.indexes:
+        names.add(list(index.columns)[0].name)
+    for constraint in table.constraints:
+        if isinstance(constraint, sa.UniqueConstraint) and constraint.columns:
+            names.add(list(constraint.columns)[0].name)
+    return names
+
+
+def get_allowed_columns(table: sa.Table, fields: Optional[Sequence[str]] = None) -> Set[str]:
+    allowed = get_indexed_columns(table)
+    if fields is not None:
+        allowed &= set(fields)
+    return allowed
+
+
+def split_lookup(key: str):
+    field, _, lookup = key.partition(LOOKUP_SEPARATOR)
+    return field, lookup or 'exact'
+
+
+def parse_bool(value: str) -> bool:
+    if value.lower() in TRUE_VALUES:
+        return True
+    if value.lower() in FALSE_VALUES:
+        return False
+    raise ValueError(value)
+
+
+def parse_value(column: ColumnElement, value: Any) -> Any:
+    if not isinstance(value, str):
+        return value
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    try:
+        if python_type is bool:
+            return parse_bool(value)
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        if python_type is date:
+            return date.fromisoformat(value)
+        return python_type(value)
+    except ValueError:
+        raise FilterError(f'Invalid value for `{column.key}`: {value!r}')
+
+
+def prefix_clause(column: ColumnElement, prefix: str):
+    # Half-open range instead of LIKE 'prefix%', so that a plain b-tree index is used on every database
+    if not prefix:
+        return sa.true()
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return sa.and_(column >= prefix, column < upper)
+
+
+def select_filters(model, q: Optional[dict], allowed: Set[str]) -> dict:
+    """
+    Keep the `q` items naming a column, other query params (utm_source, fbclid, ...) are not filters,
+    raises FilterError for a column that is not one of the `allowed` ones
+    """
+    filters = {}
+    for key, value in (q or {}).items():
+        field = split_lookup(key)[0]
+        if field not in model.__table__.columns:
+            continue
+        if field not in allowed:
+            raise FilterError(f'Filtering on `{field}` is not allowed, only whitelisted indexed columns are')
+        filters[key] = value
+    return filters
+
+
+def get_filter_clauses(model, q: Optional[dict]) -> List[Any]:
+    """
+    Translate `{'field__lookup': value}` into WHERE clauses, lookups: exact (no suffix), gt, gte, lt, lte,
+    prefix, in (comma separated) and isnull
+    """
+    clauses = []
+    for key, value in (q or {}).items():
+        field, lookup = split_lookup(key)
+        if field not in model.__table__.columns:
+            raise FilterError(f'Unknown filter field `{field}`')
+        if lookup not in LOOKUPS:
+            raise FilterError(f'Unknown lookup `{lookup}`')
+        column = model.__table__.c[field]
+        if lookup == 'exact':
+            clauses.append(column == parse_value(column, value))
+        elif lookup in RANGE_LOOKUPS:
+            clauses.append(RANGE_LOOKUPS[lookup](column, parse_value(column, value)))
+        elif lookup == 'prefix':
+            clauses.append(prefix_clause(column, str(value)))
+        elif lookup == 'in':
+            values = value.split(',') if isinstance(value, str) else value
+            clauses.append(column.in_([parse_value(column, item) for item in values]))
+        elif lookup == 'isnull':
+            try:
+                isnull = parse_bool(value) if isinstance(value, str) else bool(value)
+            except ValueError:
+                raise FilterError(f'Invalid value for `{key}`: {value!r}')
+            clauses.append(column.is_(None) if isnull else column.isnot(None))
+    return clauses
+
+
+def get_order_by_clauses(model, order_by: Optional[Iterable[Any]], allowed: Optional[Set[str]] = None) -> List[Any]:
+    """
+    Resolve 'name' / '-name' strings (user input) to columns, with `allowed` they must be one of these columns,
+    column expressions are passed through
+    """
+    clauses = []
+    for item in order_by or ():
+        if not isinstance(item, str):
+            clauses.append(item)
+            continue
+        field = item.lstrip('-')
+        if field not in model.__table__.columns:
+            raise FilterError(f'Unknown sort field `{field}`')
+        if allowed is not None and field not in allowed:
+            raise FilterError(f'Sorting on `{field}` is not allowed, only whitelisted indexed columns are')
+        column = getattr(model, field)
+        clauses.append(column.desc() if item.startswith('-') else column.asc())
+    return clauses
@@ -7,6 +7,10 @@ class Base(object):
     __name__: str
     id = sa.Column(sa.Integer, primary_key=True, index=True, )
 
+    # Load server defaults (created_at, onupdate values) during the flush, with RETURNING where
+    # the dialect supports it, so objects need no refresh after commit
+    __mapper_args__ = {'eager_defaults': True}
+
     # Generate __tablename__ automatically
     @declared_attr
     def __tablename__(cls) -> str:
@@ -0,0 +1,176 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+
+import sqlalchemy as sa
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import ColumnElement, UnaryExpression
+
+NEXT = 'next'
+PREV = 'prev'
+
+# server_default=func.now() is stored by SQLite as CURRENT_TIMESTAMP text, without microseconds
+SQLITE_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class Page(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+
+
+class CursorError(ValueError):
+    pass
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'dec': str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        if 'dec' in value:
+            return Decimal(value['dec'])
+    return value
+
+
+def encode_cursor(values: Sequence[Any], direction: str = NEXT) -> str:
+    """
+    Opaque url-safe token holding the sort key values of a boundary row
+    """
+    data = json.dumps({'v': [_encode_value(value) for value in values], 'd': direction}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        values = [_decode_value(value) for value in data['v']]
+        direction = data['d']
+    except (binascii.Error, ValueError, TypeError, KeyError) as e:
+        raise CursorError('Invalid cursor') from e
+    if direction not in (NEXT, PREV) or not isinstance(data['v'], list):
+        raise CursorError('Invalid cursor')
+    return {'values': values, 'direction': direction}
+
+
+def get_sort_keys(model, order_by: Optional[Sequence] = None) -> List[Tuple[ColumnElement, bool]]:
+    """
+    (column, descending) pairs of `order_by`, the primary key is appended as a tiebreaker
+    so that every row has a unique position
+    """
+    keys = []
+    for clause in order_by or ():
+        if isinstance(clause, str):
+            descending = clause.startswith('-')
+            clause = getattr(model, clause.lstrip('-'))
+        elif isinstance(clause, UnaryExpression) and clause.modifier in (operators.desc_op, operators.asc_op):
+            descending = clause.modifier is operators.desc_op
+            clause = clause.element
+        else:
+            descending = False
+        keys.append((clause, descending))
+    if not any(column.key == 'id' for column, _ in keys):
+        keys.append((model.id, keys[0][1] if keys else False))
+    return keys
+
+
+def bind_value(column: ColumnElement, value: Any, dialect_name: str) -> ColumnElement:
+    """
+    Bind `value` for a comparison with `column`, matching the text format SQLite stores
+    server_default timestamps in
+    """
+    if dialect_name == 'sqlite' and isinstance(value, datetime) and not value.microsecond:
+        return sa.literal(value.strftime(SQLITE_TIMESTAMP_FORMAT))
+    return sa.literal(value, type_=column.type)
+
+
+def _is_whole_second(value: Any, dialect_name: str) -> bool:
+    return dialect_name == 'sqlite' and isinstance(value, datetime) and not value.microsecond
+
+
+def _stored_value(keys, values, index: int, dialect_name: str) -> ColumnElement:
+    """
+    SQLite sorts timestamps as text, server_default ones are stored as 'YYYY-MM-DD HH:MM:SS' and the ones
+    set from Python with '.ffffff', so a whole second may be either: compare with the cursor row's own text
+    and fall back to the server_default format when that row is gone
+    """
+    column = keys[index][0]
+    id_index = next(i for i, (key, _) in enumerate(keys) if key.key == 'id')
+    stored = sa.select(column).where(keys[id_index][0] == values[id_index]).scalar_subquery()
+    return sa.func.coalesce(stored, bind_value(column, values[index], dialect_name))
+
+
+def _seek_condition(keys, values, direction: str, dialect_name: str):
+    """
+    WHERE clause selecting the rows after (or before) the cursor row in `keys` order
+    """
+    if len(values) != len(keys):
+        raise CursorError('Invalid cursor')
+    values = [
+        _stored_value(keys, values, index, dialect_name) if _is_whole_second(value, dialect_name)
+        else bind_value(column, value, dialect_name)
+        for index, ((column, _), value) in enumerate(zip(keys, values))
+    ]
+
+    def after(left, right, descending: bool):
+        return left < right if descending != (direction == PREV) else left > right
+
+    if len({descending for _, descending in keys}) == 1:
+        # Row value comparison, lets the database use a composite index on the sort keys
+        return after(sa.tuple_(*(column for column, _ in keys)), sa.tuple_(*values), keys[0][1])
+
+    clauses = []
+    for index, (column, descending) in enumerate(keys):
+        equal = [keys[i][0] == values[i] for i in range(index)]
+        clauses.append(sa.and_(*equal, after(column, values[index], descending)))
+    return sa.or_(*clauses)
+
+
+def paginate_stmt(stmt, model, *, order_by: Optional[Sequence], limit: int, cursor: Optional[dict],
+                  dialect_name: str):
+    """
+    Apply keyset ordering, seek condition and limit (+1 to detect a further page) to a select
+    """
+    keys = get_sort_keys(model, order_by)
+    direction = cursor['direction'] if cursor else NEXT
+    if cursor:
+        stmt = stmt.where(_seek_condition(keys, cursor['values'], direction, dialect_name))
+    reverse = direction == PREV
+    stmt = stmt.order_by(*(
+        column.desc() if descending != reverse else column.asc() for column, descending in keys
+    ))
+    return stmt.limit(limit + 1), keys
+
+
+def build_page(rows: Sequence[Any], keys, *, limit: int, cursor: Optional[dict]) -> Page:
+    direction = cursor['direction'] if cursor else NEXT
+    has_more = len(rows) > limit
+    items = list(rows[:limit])
+    if direction == PREV:
+        items.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, cursor is not None
+
+    def key_values(item):
+        return [getattr(item, column.key) for column, _ in keys]
+
+    return Page(
+        items=items,
+        next_cursor=encode_cursor(key_values(items[-1]), NEXT) if items and has_next else None,
+        prev_cursor=encode_cursor(key_values(items[0]), PREV) if items and has_prev else None,
+    )
@@ -1,13 +1,27 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union, TYPE_CHECKING
+from typing import Any, Dict, Generic, Iterator, List, Optional, Sequence, Type, TypeVar, Union, TYPE_CHECKING
 
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy import inspect, select
 
+from .bulk import (
+    bulk_delete_stmt, bulk_insert_chunks, bulk_insert_stmt, bulk_update_by_pk_stmt, bulk_update_params,
+    bulk_update_stmt, chunked, get_chunk_size, get_inserted_ids,
+)
+from .counts import (
+    COUNT_ESTIMATED, COUNT_EXACT, async_get_estimated_count, count_cache, count_cache_key, count_stmt,
+    get_estimated_count, mark_tables_written,
+)
 from .models import Base
+from .filters import get_allowed_columns, get_filter_clauses, get_order_by_clauses, select_filters
+from .search import search_indexes
+from .pagination import Page, build_page, get_sort_keys, paginate_stmt
+from .routing import REPLICA_OPTION
 from app.conf.config import settings
 
 ModelType = TypeVar("ModelType", bound=Base)
 
 if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
     from sqlalchemy.orm import Session
 
 
@@ -23,23 +37,126 @@ class CRUDBase(Generic[ModelType,]):
         """
         self.model = model
 
-    def count(self, db: "Session", *, q: Optional[dict] = None, **kwargs):
-        if q is None:
-            q = {}
-        return db.query(self.model).filter_by(**q).count()
+    # Columns list views may filter and sort on, only the indexed ones among them are accepted
+    filter_fields: Optional[Sequence[str]] = None
+
+    def clean_filters(self, q: Optional[dict] = None) -> dict:
+        """
+        Filters of the request query string: params not naming a column are ignored, raises FilterError for
+        columns that are not indexed `filter_fields`, lookups and values are validated when the clauses are built
+        """
+        return select_filters(self.model, q, get_allowed_columns(self.model.__table__, self.filter_fields))
+
+    def clean_order_by(self, order_by: Optional[list] = None) -> list:
+        """
+        Sort fields of the request query string, raises FilterError unless they are indexed `filter_fields` columns
+        """
+        return get_order_by_clauses(
+            self.model, order_by, get_allowed_columns(self.model.__table__, self.filter_fields),
+        )
+
+    def get_filter_clauses(self, q: Optional[dict] = None) -> list:
+        """
+        WHERE clauses of the `q` filter DSL (`field__gte`, `field__prefix`, `field__in`, `field__isnull`, ...),
+        raises FilterError for unknown fields, lookups or invalid values
+        """
+        return get_filter_clauses(self.model, q)
+
+    def get_order_by(self, order_by: Optional[list] = None) -> list:
+        """
+        Column expressions are used as is, 'name' / '-name' strings are resolved to columns
+        """
+        return get_order_by_clauses(self.model, order_by)
+
+    def set_fields(self, db_obj: ModelType, obj_in: Union[Dict[str, Any], Any]) -> ModelType:
+        """
+        Copy the column values of `obj_in` (dict or pydantic model) to `db_obj`
+        :param db_obj:
+        :param obj_in:
+        :return:
+        """
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        for field in inspect(self.model).column_attrs.keys():
+            if field in update_data:
+                setattr(db_obj, field, update_data[field])
+        return db_obj
 
-    def get_by_params(self, db: "Session", params: dict, ) -> Optional[ModelType]:
+    def count(self, db: "Session", *, q: Optional[dict] = None, strategy: Optional[str] = None, **kwargs) -> int:
+        """
+        Count items
+        :param db:
+        :param q:
+        :param strategy: COUNT_EXACT, COUNT_CACHED (exact, reused until this process commits a write
+               to the table or COUNT_CACHE_TTL expires)
+               or COUNT_ESTIMATED (database statistics for large unfiltered tables), defaults to settings.COUNT_STRATEGY
+        :param kwargs:
+        :return:
+        """
+        strategy = strategy or settings.COUNT_STRATEGY
+        if strategy == COUNT_ESTIMATED and not q:
+            estimate = get_estimated_count(db, self.model)
+            if estimate is not None and estimate >= settings.COUNT_ESTIMATE_THRESHOLD:
+                return estimate
+        if strategy == COUNT_EXACT:
+            return db.execute(self.get_count_stmt(q)).scalar_one()
+        key = count_cache_key(self.model, q)
+        total = count_cache.get(key)
+        if total is None:
+            total = db.execute(self.get_count_stmt(q, use_replica=False)).scalar_one()
+            count_cache.set(key, total)
+        return total
+
+    def get_count_stmt(self, q: Optional[dict] = None, use_replica: bool = True):
+        """
+        Cached counts are read from the primary, a lagging replica would cache a total
+        from before the write that just invalidated it
+        """
+        return count_stmt(self.model, self.get_filter_clauses(q)).execution_options(**{REPLICA_OPTION: use_replica})
+
+    def get_columns(self, columns: Sequence[Any]) -> list:
+        return [getattr(self.model, column) if isinstance(column, str) else column for column in columns]
+
+    def get_select(self, columns: Optional[Sequence[Any]] = None, options: Optional[Sequence[Any]] = None):
+        """
+        SELECT of the model, or only of `columns` (names or attributes) which yields lightweight
+        `Row` tuples with attribute access instead of ORM objects.
+        It may be answered by a read replica unless the session already wrote
+        :param columns:
+        :param options: loader options for model selects, e.g. `load_only(...)`, `defer(...)`, `selectinload(...)`
+        :return:
+        """
+        stmt = select(*self.get_columns(columns)) if columns else select(self.model)
+        stmt = stmt.execution_options(**{REPLICA_OPTION: True})
+        if options:
+            stmt = stmt.options(*options)
+        return stmt
+
+    @staticmethod
+    def get_rows(result, columns: Optional[Sequence[Any]] = None):
+        return result if columns else result.scalars()
+
+    def get_by_params(
+            self, db: "Session", params: dict, *,
+            columns: Optional[Sequence[Any]] = None, options: Optional[Sequence[Any]] = None,
+    ) -> Optional[ModelType]:
         """
         Retrieve items by params
         :param db:
         :param params:
+        :param columns: see `get_select`
+        :param options: see `get_select`
         :return:
         """
-        return db.query(self.model).filter_by(**params).first()
+        stmt = self.get_select(columns, options).filter_by(**params).limit(1)
+        return self.get_rows(db.execute(stmt), columns).first()
 
     def get_all(
             self, db: "Session", *, offset: Optional[int] = 0, limit: Optional[int] = settings.PAGINATION_MAX_SIZE,
             q: Optional[dict] = None, order_by: Optional[list] = None,
+            columns: Optional[Sequence[Any]] = None, options: Optional[Sequence[Any]] = None,
             **kwargs,
     ) -> Union[List[ModelType], Any]:
         """
@@ -49,6 +166,8 @@ class CRUDBase(Generic[ModelType,]):
         :param limit:
         :param q:
         :param order_by:
+        :param columns: see `get_select`
+        :param options: see `get_select`
         :param kwargs:
         :return:
         """
@@ -56,7 +175,89 @@ class CRUDBase(Generic[ModelType,]):
             order_by = []
         if q is None:
             q = {}
-        return db.query(self.model).order_by(*order_by).filter_by(**q).offset(offset).limit(limit).all()
+        stmt = self.get_select(columns, options).where(*self.get_filter_clauses(q)).order_by(
+            *self.get_order_by(order_by)
+        ).offset(offset).limit(limit)
+        return self.get_rows(db.execute(stmt), columns).all()
+
+    def get_page(
+            self, db: "Session", *, cursor: Optional[dict] = None,
+            limit: Optional[int] = settings.PAGINATION_MAX_SIZE,
+            q: Optional[dict] = None, order_by: Optional[list] = None,
+            columns: Optional[Sequence[Any]] = None, options: Optional[Sequence[Any]] = None,
+            **kwargs,
+    ) -> Page:
+        """
+        Keyset pagination, the cost of a page does not grow with its depth
+        :param db:
+        :param cursor: decoded cursor of the previous page, see `app.db.pagination.decode_cursor`
+        :param limit:
+        :param q:
+        :param order_by: columns, `column.desc()` or '-name' strings, the primary key is added as tiebreaker
+        :param columns: see `get_select`, the sort keys are selected too as the cursor is built from them
+        :param options: see `get_select`
+        :param kwargs:
+        :return:
+        """
+        order_by = self.get_order_by(order_by)
+        stmt, keys = paginate_stmt(
+            self.get_select(self.get_page_columns(columns, order_by), options).where(*self.get_filter_clauses(q)),
+            self.model, order_by=order_by, limit=limit, cursor=cursor, dialect_name=db.get_bind().dialect.name,
+        )
+        return build_page(self.get_rows(db.execute(stmt), columns).all(), keys, limit=limit, cursor=cursor)
+
+    def iter_all(
+            self, db: "Session", *, q: Optional[dict] = None, where: Optional[Sequence[Any]] = None,
+            order_by: Optional[list] = None, columns: Optional[Sequence[Any]] = None,
+            yield_per: Optional[int] = None,
+    ) -> Iterator[Any]:
+        """
+        Stream all matching items through a server-side cursor, at most `yield_per` rows are held in memory
+        :param db:
+        :param q:
+        :param where: extra filter clauses
+        :param order_by: defaults to the primary key
+        :param columns: see `get_select`
+        :param yield_per: defaults to settings.EXPORT_YIELD_PER
+        :return:
+        """
+        stmt = self.get_select(columns).where(*self.get_filter_clauses(q), *(where or ()))
+        stmt = stmt.order_by(*(self.get_order_by(order_by) or (self.model.id,))).execution_options(
+            stream_results=True, yield_per=yield_per or settings.EXPORT_YIELD_PER,
+        )
+        yield from self.get_rows(db.execute(stmt), columns)
+
+    def search(
+            self, db: "Session", query: str, *, limit: Optional[int] = settings.PAGINATION_MAX_SIZE,
+            q: Optional[dict] = None, columns: Optional[Sequence[Any]] = None,
+            options: Optional[Sequence[Any]] = None,
+    ) -> List[Any]:
+        """
+        Full-text search over the model's SearchIndex, best matches first
+        :param db:
+        :param query: words typed by the user, every word must match (as a prefix)
+        :param limit:
+        :param q:
+        :param columns: see `get_select`
+        :param options: see `get_select`
+        :return:
+        """
+        stmt = self.get_search_stmt(query, db.get_bind().dialect.name, q, columns, options).limit(limit)
+        return self.get_rows(db.execute(stmt), columns).all()
+
+    def get_search_stmt(self, query: str, dialect_name: str, q=None, columns=None, options=None):
+        index = search_indexes.get(self.model.__table__.name)
+        if index is None:
+            raise NotImplementedError(f'{self.model.__name__} has no SearchIndex')
+        return index.apply(self.get_select(columns, options).where(*self.get_filter_clauses(q)), query, dialect_name)
+
+    def get_page_columns(self, columns: Optional[Sequence[Any]], order_by: Optional[list]) -> Optional[list]:
+        if not columns:
+            return None
+        columns = self.get_columns(columns)
+        keys = [key for key, _ in get_sort_keys(self.model, order_by)]
+        selected = {column.key for column in columns}
+        return columns + [key for key in keys if key.key not in selected]
 
     def create(self, db: "Session", *, obj_in: Union[Dict[str, Any]]) -> ModelType:
         """
@@ -69,7 +270,6 @@ class CRUDBase(Generic[ModelType,]):
         db_obj = self.model(**obj_in_data)  # type: ignore
         db.add(db_obj)
         db.commit()
-        db.refresh(db_obj)
         return db_obj
 
     def update(
@@ -79,17 +279,9 @@ class CRUDBase(Generic[ModelType,]):
             db_obj: ModelType,
             obj_in: Union[Dict[str, Any]]
     ) -> ModelType:
-        obj_data = jsonable_encoder(db_obj, )
-        if isinstance(obj_in, dict):
-            update_data = obj_in
-        else:
-            update_data = obj_in.dict(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        self.set_fields(db_obj, obj_in)
         db.add(db_obj)
         db.commit()
-        db.refresh(db_obj)
         return db_obj
 
     @staticmethod
@@ -105,3 +297,272 @@ class CRUDBase(Generic[ModelType,]):
         db.delete(db_obj)
         db.commit()
         return db_obj
+
+    def bulk_create(
+            self, db: "Session", *, objs_in: Sequence[Dict[str, Any]], chunk_size: Optional[int] = None,
+    ) -> List[Any]:
+        """
+        Insert many items with multi-row INSERTs in one transaction, the rows must share the same keys
+        :param db:
+        :param objs_in:
+        :param chunk_size: rows per statement, defaults to settings.BULK_CHUNK_SIZE
+        :return: primary keys of the created items
+        """
+        objs_in = list(objs_in)
+        if not objs_in:
+            return []
+        dialect = db.get_bind().dialect
+        ids = []
+        chunk_size = get_chunk_size(dialect, len(self.model.__table__.columns), chunk_size)
+        for chunk in bulk_insert_chunks(objs_in, dialect, chunk_size):
+            result = db.execute(bulk_insert_stmt(self.model, chunk, dialect))
+            ids.extend(get_inserted_ids(result, chunk, dialect))
+        mark_tables_written(db, self.model.__table__.name)
+        db.commit()
+        return ids
+
+    def bulk_update(
+            self, db: "Session", *, objs_in: Union[Sequence[Dict[str, Any]], Dict[str, Any]],
+            ids: Optional[Sequence[Any]] = None, q: Optional[dict] = None, chunk_size: Optional[int] = None,
+    ) -> int:
+        """
+        Update many items in one transaction
+        :param db:
+        :param objs_in: rows with their `id` and new values (executemany, same keys in every row),
+               or a dict of values applied to every item matched by `ids` and `q`
+        :param ids:
+        :param q:
+        :param chunk_size: rows per statement, defaults to settings.BULK_CHUNK_SIZE
+        :return: number of updated rows
+        """
+        dialect = db.get_bind().dialect
+        total = 0
+        for stmt, params in self._bulk_update_statements(dialect, objs_in, ids, q, chunk_size):
+            total += db.execute(stmt, params).rowcount
+        mark_tables_written(db, self.model.__table__.name)
+        db.commit()
+        return total
+
+    def bulk_delete(
+            self, db: "Session", *, ids: Optional[Sequence[Any]] = None, q: Optional[dict] = None,
+            chunk_size: Optional[int] = None,
+    ) -> int:
+        """
+        Delete the items matched by `ids` and/or `q` in one transaction, pass `q={}` to empty the table
+        :param db:
+        :param ids:
+        :param q:
+        :param chunk_size: ids per statement, defaults to settings.BULK_CHUNK_SIZE
+        :return: number of deleted rows
+        """
+        dialect = db.get_bind().dialect
+        total = 0
+        for stmt in self._bulk_delete_statements(dialect, ids, q, chunk_size):
+            total += db.execute(stmt).rowcount
+        mark_tables_written(db, self.model.__table__.name)
+        db.commit()
+        return total
+
+    def _bulk_update_statements(self, dialect, objs_in, ids, q, chunk_size):
+        if not isinstance(objs_in, dict):
+            rows = bulk_update_params(objs_in)
+            if rows:
+                stmt = bulk_update_by_pk_stmt(self.model, [key for key in rows[0] if key != '_pk'])
+                for chunk in chunked(rows, get_chunk_size(dialect, len(rows[0]), chunk_size)):
+                    yield stmt, chunk
+            return
+        if ids is None and q is None:
+            raise ValueError('bulk_update with values needs `ids` or `q`')
+        if ids is None:
+            yield bulk_update_stmt(self.model, objs_in, None, q), None
+            return
+        ids = list(ids)
+        for chunk in chunked(ids, get_chunk_size(dialect, 1 + len(objs_in) + len(q or {}), chunk_size)):
+            yield bulk_update_stmt(self.model, objs_in, chunk, q), None
+
+    def _bulk_delete_statements(self, dialect, ids, q, chunk_size):
+        if ids is None and q is None:
+            raise ValueError('bulk_delete needs `ids` or `q`')
+        if ids is None:
+            yield bulk_delete_stmt(self.model, None, q)
+            return
+        ids = list(ids)
+        for chunk in chunked(ids, get_chunk_size(dialect, 1 + len(q or {}), chunk_size)):
+            yield bulk_delete_stmt(self.model, chunk, q)
+
+    async def async_count(
+            self, db: "AsyncSession", *, q: Optional[dict] = None, strategy: Optional[str] = None, **kwargs,
+    ) -> int:
+        """
+        Count items, see `count`
+        """
+        strategy = strategy or settings.COUNT_STRATEGY
+        if strategy == COUNT_ESTIMATED and not q:
+            estimate = await async_get_estimated_count(db, self.model)
+            if estimate is not None and estimate >= settings.COUNT_ESTIMATE_THRESHOLD:
+                return estimate
+        if strategy == COUNT_EXACT:
+            return (await db.execute(self.get_count_stmt(q))).scalar_one()
+        key = count_cache_key(self.model, q)
+        total = count_cache.get(key)
+        if total is None:
+            total = (await db.execute(self.get_count_stmt(q, use_replica=False))).scalar_one()
+            count_cache.set(key, total)
+        return total
+
+    async def async_get_by_params(
+            self, db: "AsyncSession", params: dict, *,
+            columns: Optional[Sequence[Any]] = None, options: Optional[Sequence[Any]] = None,
+    ) -> Optional[ModelType]:
+        """
+        Retrieve items by params without blocking the event loop
+        :param db:
+        :param params:
+        :param columns: see `get_select`
+        :param options: see `get_select`
+        :return:
+        """
+        stmt = self.get_select(columns, options).filter_by(**params).limit(1)
+        return self.get_rows(await db.execute(stmt), columns).first()
+
+    async def async_get_all(
+            self, db: "AsyncSession", *, offset: Optional[int] = 0,
+            limit: Optional[int] = settings.PAGINATION_MAX_SIZE,
+            q: Optional[dict] = None, order_by: Optional[list] = None,
+            columns: Optional[Sequence[Any]] = None, options: Optional[Sequence[Any]] = None,
+            **kwargs,
+    ) -> Union[List[ModelType], Any]:
+        """
+
+        :param db:
+        :param offset:
+        :param limit:
+        :param q:
+        :param order_by:
+        :param columns: see `get_select`
+        :param options: see `get_select`
+        :param kwargs:
+        :return:
+        """
+        if order_by is None:
+            order_by = []
+        if q is None:
+            q = {}
+        stmt = self.get_select(columns, options).where(*self.get_filter_clauses(q)).order_by(
+            *self.get_order_by(order_by)
+        ).offset(offset).limit(limit)
+        return self.get_rows(await db.execute(stmt), columns).all()
+
+    async def async_get_page(
+            self, db: "AsyncSession", *, cursor: Optional[dict] = None,
+            limit: Optional[int] = settings.PAGINATION_MAX_SIZE,
+            q: Optional[dict] = None, order_by: Optional[list] = None,
+            columns: Optional[Sequence[Any]] = None, options: Optional[Sequence[Any]] = None,
+            **kwargs,
+    ) -> Page:
+        """
+        Keyset pagination, see `get_page`
+        """
+        order_by = self.get_order_by(order_by)
+        stmt, keys = paginate_stmt(
+            self.get_select(self.get_page_columns(columns, order_by), options).where(*self.get_filter_clauses(q)),
+            self.model, order_by=order_by, limit=limit, cursor=cursor, dialect_name=db.bind.dialect.name,
+        )
+        return build_page(self.get_rows((await db.execute(stmt)), columns).all(), keys, limit=limit, cursor=cursor)
+
+    async def async_search(
+            self, db: "AsyncSession", query: str, *, limit: Optional[int] = settings.PAGINATION_MAX_SIZE,
+            q: Optional[dict] = None, columns: Optional[Sequence[Any]] = None,
+            options: Optional[Sequence[Any]] = None,
+    ) -> List[Any]:
+        """
+        Full-text search, see `search`
+        """
+        stmt = self.get_search_stmt(query, db.bind.dialect.name, q, columns, options).limit(limit)
+        return self.get_rows(await db.execute(stmt), columns).all()
+
+    async def async_create(self, db: "AsyncSession", *, obj_in: Union[Dict[str, Any]]) -> ModelType:
+        """
+        Create item
+        :param db:
+        :param obj_in:
+        :return:
+        """
+        obj_in_data = jsonable_encoder(obj_in)
+        db_obj = self.model(**obj_in_data)  # type: ignore
+        db.add(db_obj)
+        await db.commit()
+        return db_obj
+
+    async def async_update(
+            self,
+            db: "AsyncSession",
+            *,
+            db_obj: ModelType,
+            obj_in: Union[Dict[str, Any]]
+    ) -> ModelType:
+        self.set_fields(db_obj, obj_in)
+        db.add(db_obj)
+        await db.commit()
+        return db_obj
+
+    @staticmethod
+    async def async_delete(db: "AsyncSession", *,
+                           db_obj: ModelType,
+                           ) -> ModelType:
+        """
+        Delete item
+        :param db_obj:
+        :param db:
+        :return:
+        """
+        await db.delete(db_obj)
+        await db.commit()
+        return db_obj
+
+    async def async_bulk_create(
+            self, db: "AsyncSession", *, objs_in: Sequence[Dict[str, Any]], chunk_size: Optional[int] = None,
+    ) -> List[Any]:
+        """
+        Insert many items in one transaction, see `bulk_create`
+        """
+        objs_in = list(objs_in)
+        if not objs_in:
+            return []
+        dialect = db.bind.dialect
+        ids = []
+        chunk_size = get_chunk_size(dialect, len(self.model.__table__.columns), chunk_size)
+        for chunk in bulk_insert_chunks(objs_in, dialect, chunk_size):
+            result = await db.execute(bulk_insert_stmt(self.model, chunk, dialect))
+            ids.extend(get_inserted_ids(result, chunk, dialect))
+        mark_tables_written(db.sync_session, self.model.__table__.name)
+        await db.commit()
+        return ids
+
+    async def async_bulk_update(
+            self, db: "AsyncSession", *, objs_in: Union[Sequence[Dict[str, Any]], Dict[str, Any]],
+            ids: Optional[Sequence[Any]] = None, q: Optional[dict] = None, chunk_size: Optional[int] = None,
+    ) -> int:
+        """
+        Update many items in one transaction, see `bulk_update`
+        """
+        total = 0
+        for stmt, params in self._bulk_update_statements(db.bind.dialect, objs_in, ids, q, chunk_size):
+            total += (await db.execute(stmt, params)).rowcount
+        mark_tables_written(db.sync_session, self.model.__table__.name)
+        await db.commit()
+        return total
+
+    async def async_bulk_delete(
+            self, db: "AsyncSession", *, ids: Optional[Sequence[Any]] = None, q: Optional[dict] = None,
+            chunk_size: Optional[int] = None,
+    ) -> int:
+        """
+        Delete many items in one transaction, see `bulk_delete`
+        """
+        total = 0
+        for stmt in self._bulk_delete_statements(db.bind.dialect, ids, q, chunk_size):
+            total += (await db.execute(stmt)).rowcount
+        mark_tables_written(db.sync_session, self.model.__table__.name)
+        await db.commit()
+        return total
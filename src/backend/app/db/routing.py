@@ -0,0 +1,149 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import Optional, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+__all__ = ('REPLICA_OPTION', 'ReplicaSet', 'RoutingSession')
+
+logger = logging.getLogger(__name__)
+
+# Execution option marking a statement that may be answered by a replica
+REPLICA_OPTION = 'use_replica'
+
+
+class ReplicaSet:
+    """
+    Round-robin over replica engines, an engine whose connection failed is
+    left out for `retry_interval` seconds.
+
+    With `probe_interval` a background thread also tries every replica that often, so a replica
+    going down is left out before requests fail on it and one coming back is used again.
+    `probe_engines` are used for the probe instead of `engines`, e.g. sync engines of the same
+    URIs for async engines
+    """
+
+    def __init__(
+            self,
+            engines: Sequence[Engine],
+            retry_interval: float = 30,
+            probe_interval: float = 0,
+            probe_engines: Optional[Sequence[Engine]] = None,
+    ):
+        self.engines = list(engines)
+        self.retry_interval = retry_interval
+        self.probe_interval = probe_interval
+        self.probe_engines = list(probe_engines) if probe_engines is not None else self.engines
+        self._down_until = {}
+        self._cycle = itertools.cycle(self.engines)
+        self._lock = threading.Lock()
+        self._probe_pid = None
+        for bind in self.engines:
+            event.listen(bind, 'handle_error', self._on_error)
+
+    def __len__(self) -> int:
+        return len(self.engines)
+
+    def _on_error(self, context) -> None:
+        # context.connection is None when the connection could not be established at all
+        if context.is_disconnect or context.connection is None:
+            self.mark_down(context.engine)
+
+    def mark_down(self, bind: Engine) -> None:
+        with self._lock:
+            self._down_until[bind] = time.monotonic() + self.retry_interval
+
+    def mark_up(self, bind: Engine) -> None:
+        with self._lock:
+            self._down_until.pop(bind, None)
+
+    def is_healthy(self, bind: Engine) -> bool:
+        return self._down_until.get(bind, 0) <= time.monotonic()
+
+    def probe(self) -> None:
+        """
+        Run SELECT 1 on every replica, marking it down when it fails and back up when it answers
+        """
+        for bind, probe_bind in zip(self.engines, self.probe_engines):
+            healthy = self.is_healthy(bind)
+            try:
+                with probe_bind.connect() as connection:
+                    connection.exec_driver_sql('SELECT 1')
+            except SQLAlchemyError as e:
+                if healthy:
+                    logger.warning('Replica %r is down: %s', bind.url, e)
+                self.mark_down(bind)
+            else:
+                self.mark_up(bind)
+
+    def _probe_forever(self) -> None:
+        while True:
+            time.sleep(self.probe_interval)
+            self.probe()
+
+    def start_probe(self) -> None:
+        """
+        Start the probe thread of this process, once, threads do not survive the fork of gunicorn workers
+        """
+        if not self.probe_interval or not self.engines or self._probe_pid == os.getpid():
+            return
+        with self._lock:
+            if self._probe_pid == os.getpid():
+                return
+            self._probe_pid = os.getpid()
+        threading.Thread(target=self._probe_forever, name='replica-probe', daemon=True).start()
+
+    def choose(self) -> Optional[Engine]:
+        """
+        Next healthy replica, None when all of them are down
+        """
+        self.start_probe()
+        with self._lock:
+            for _ in range(len(self.engines)):
+                bind = next(self._cycle)
+                if self.is_healthy(bind):
+                    return bind
+        return None
+
+    def status(self) -> list:
+        return [
+            {'url': repr(bind.url), 'healthy': self.is_healthy(bind)}
+            for bind in self.engines
+        ]
+
+
+def is_replica_read(clause) -> bool:
+    if clause is None or getattr(clause, '_for_update_arg', None) is not None:
+        return False
+    return bool(clause.get_execution_options().get(REPLICA_OPTION))
+
+
+class RoutingSession(Session):
+    """
+    Sends statements marked with the `use_replica` execution option to a replica
+    and everything else to the primary `bind`.
+
+    Once the session flushed or executed a write it sticks to the primary, so a
+    request reads its own writes
+    """
+
+    def __init__(self, *args, replicas: Optional[ReplicaSet] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self.use_primary = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.use_primary = True
+        elif self.replicas and not self.use_primary and is_replica_read(clause):
+            bind = self.replicas.choose()
+            if bind is not None:
+                return bind
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
@@ -0,0 +1,91 @@
+import re
+from typing import Dict, List, Sequence
+
+import sqlalchemy as sa
+from sqlalchemy import DDL, event
+
+from app.conf.config import settings
+
+# Words of the user query, anything else (quotes, operators, parentheses) is dropped so that
+# input can never be a syntax error in FTS5 MATCH or to_tsquery
+SEARCH_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+search_indexes: Dict[str, "SearchIndex"] = {}
+
+
+def get_search_tokens(query: str) -> List[str]:
+    return SEARCH_TOKEN_RE.findall(query or '')[:settings.SEARCH_MAX_TERMS]
+
+
+class SearchIndex:
+    """
+    Full-text index over text columns of a table, kept in sync by the database itself:
+    an external content FTS5 table with triggers on SQLite, a generated `tsvector`
+    column with a GIN index on Postgres. Terms are AND-ed and prefix matched
+    """
+
+    def __init__(self, table: sa.Table, columns: Sequence[str]):
+        self.table = table
+        self.columns = tuple(columns)
+        self.fts_name = f'{table.name}_fts'
+        self.vector_name = 'search_vector'
+        for statement in self.sqlite_ddl():
+            event.listen(table, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+        for statement in self.postgresql_ddl():
+            event.listen(table, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+        event.listen(table, 'before_drop', DDL(f'DROP TABLE IF EXISTS {self.fts_name}').execute_if(dialect='sqlite'))
+        search_indexes[table.name] = self
+
+    def sqlite_ddl(self) -> List[str]:
+        table, fts = self.table.name, self.fts_name
+        columns = ', '.join(self.columns)
+        new = ', '.join(f'new.{column}' for column in self.columns)
+        old = ', '.join(f'old.{column}' for column in self.columns)
+        return [
+            f"CREATE VIRTUAL TABLE {fts} USING fts5({columns}, content='{table}', content_rowid='id')",
+            f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new}); END",
+            f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old}); END",
+            f"CREATE TRIGGER {fts}_au AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old}); "
+            f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new}); END",
+        ]
+
+    def postgresql_ddl(self) -> List[str]:
+        # Earlier columns weigh more in the ranking: A, B, C, D
+        vector = ' || '.join(
+            f"setweight(to_tsvector('{settings.SEARCH_CONFIG}'::regconfig, coalesce({column}, '')), '{weight}')"
+            for column, weight in zip(self.columns, 'ABCD')
+        )
+        return [
+            f'ALTER TABLE "{self.table.name}" ADD COLUMN {self.vector_name} tsvector '
+            f'GENERATED ALWAYS AS ({vector}) STORED',
+            f'CREATE INDEX ix_{self.table.name}_{self.vector_name} ON "{self.table.name}" '
+            f'USING gin ({self.vector_name})',
+        ]
+
+    def apply(self, stmt, query: str, dialect_name: str):
+        """
+        Restrict `stmt` to the rows matching `query`, best matches first
+        """
+        tokens = get_search_tokens(query)
+        if not tokens:
+            return stmt.where(sa.false())
+        if dialect_name == 'postgresql':
+            vector = sa.literal_column(f'"{self.table.name}".{self.vector_name}')
+            ts_query = sa.func.to_tsquery(
+                sa.literal_column(f"'{settings.SEARCH_CONFIG}'::regconfig"),
+                ' & '.join(f'{token}:*' for token in tokens),
+            )
+            return stmt.where(vector.op('@@')(ts_query)).order_by(sa.func.ts_rank(vector, ts_query).desc())
+        if dialect_name == 'sqlite':
+            fts = sa.table(self.fts_name, sa.column('rowid'), sa.column('rank'))
+            match = ' '.join('"{}"*'.format(token) for token in tokens)
+            return stmt.join(fts, fts.c.rowid == self.table.c.id).where(
+                sa.literal_column(self.fts_name).op('MATCH')(match)
+            ).order_by(fts.c.rank)
+        # No index on this database, fall back to scanning with LIKE
+        return stmt.where(sa.and_(*(
+            sa.or_(*(self.table.c[column].ilike(f'%{token}%') for column in self.columns)) for token in tokens
+        )))
@@ -1,12 +1,146 @@
-from sqlalchemy import create_engine
+import threading
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
-from app.conf.config import settings
+from app.conf.config import settings, get_async_db_uri
+from .routing import ReplicaSet, RoutingSession
+
+
+def get_engine_options(uri: str) -> dict:
+    """
+    create_engine keyword arguments for the dialect and driver of `uri`
+    """
+    url = make_url(uri)
+    backend, driver = url.get_backend_name(), url.get_driver_name()
+    pre_ping = settings.SQLALCHEMY_POOL_PRE_PING
+    options = {'pool_pre_ping': backend != 'sqlite' if pre_ping is None else pre_ping}
+    if backend == 'sqlite':
+        if driver == 'pysqlite':
+            options['connect_args'] = {'check_same_thread': False}
+        # SQLAlchemy picks NullPool / SingletonThreadPool for SQLite, pool sizing does not apply
+        return options
+    options.update(
+        pool_size=settings.SQLALCHEMY_POOL_SIZE,
+        max_overflow=settings.SQLALCHEMY_MAX_OVERFLOW,
+        pool_recycle=settings.SQLALCHEMY_POOL_RECYCLE,
+        pool_timeout=settings.SQLALCHEMY_POOL_TIMEOUT,
+    )
+    if backend == 'postgresql' and settings.POSTGRES_STATEMENT_TIMEOUT:
+        if driver == 'asyncpg':
+            options['connect_args'] = {
+                'server_settings': {'statement_timeout': str(settings.POSTGRES_STATEMENT_TIMEOUT)},
+            }
+        else:
+            options['connect_args'] = {'options': f'-c statement_timeout={settings.POSTGRES_STATEMENT_TIMEOUT}'}
+    return options
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f'PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}')
+    cursor.execute(f'PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}')
+    cursor.execute(f'PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}')
+    cursor.execute(f'PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT)}')
+    cursor.close()
+
+
+def configure_engine(bind: Engine) -> Engine:
+    if bind.dialect.name == 'sqlite':
+        event.listen(bind, 'connect', set_sqlite_pragmas)
+    return bind
+
+
+def get_engine(uri: str) -> Engine:
+    return configure_engine(create_engine(uri, **get_engine_options(uri)))
+
+
+def get_async_engine(uri: str) -> AsyncEngine:
+    bind = create_async_engine(uri, **get_engine_options(uri))
+    configure_engine(bind.sync_engine)
+    return bind
+
 
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, pool_pre_ping=True, connect_args={"check_same_thread": False} )
+engine = get_engine(settings.SQLALCHEMY_DATABASE_URI)
+replicas = ReplicaSet(
+    [get_engine(uri) for uri in settings.SQLALCHEMY_REPLICA_URIS],
+    retry_interval=settings.SQLALCHEMY_REPLICA_RETRY_INTERVAL,
+    probe_interval=settings.SQLALCHEMY_REPLICA_PROBE_INTERVAL,
+)
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
+    # Server defaults are loaded by the flush (eager_defaults), keep them instead of reloading every object
+    expire_on_commit=False,
     # twophase=True,
+    class_=RoutingSession,
+    replicas=replicas,
     bind=engine, )
 
+async_engine = get_async_engine(settings.ASYNC_SQLALCHEMY_DATABASE_URI)
+async_replicas = ReplicaSet(
+    [get_async_engine(get_async_db_uri(uri)).sync_engine for uri in settings.SQLALCHEMY_REPLICA_URIS],
+    retry_interval=settings.SQLALCHEMY_REPLICA_RETRY_INTERVAL,
+    # Async engines cannot connect outside of the event loop, probe the same replicas with the sync engines
+    probe_interval=settings.SQLALCHEMY_REPLICA_PROBE_INTERVAL,
+    probe_engines=replicas.engines,
+)
+AsyncSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    # Objects are read after commit outside of the greenlet context, never lazy load them
+    expire_on_commit=False,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    replicas=async_replicas,
+    bind=async_engine, )
+
+
+class PoolCounter:
+    """
+    Counts connection pool checkouts and checkins of an engine, `checked_out`
+    staying flat between requests proves that no connection is leaked
+    """
+
+    def __init__(self, bind: Engine):
+        self.bind = bind
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self._lock = threading.Lock()
+        event.listen(bind, 'connect', self._on_connect)
+        event.listen(bind, 'checkout', self._on_checkout)
+        event.listen(bind, 'checkin', self._on_checkin)
+
+    def _on_connect(self, *args) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, *args) -> None:
+        with self._lock:
+            self.checkouts += 1
+
+    def _on_checkin(self, *args) -> None:
+        with self._lock:
+            self.checkins += 1
+
+    @property
+    def checked_out(self) -> int:
+        return self.checkouts - self.checkins
+
+    def dict(self) -> dict:
+        return {
+            'connects': self.connects,
+            'checkouts': self.checkouts,
+            'checkins': self.checkins,
+            'checked_out': self.checked_out,
+            'pool': self.bind.pool.status(),
+        }
+
+
+pool_counters = {
+    'sync': PoolCounter(engine),
+    'async': PoolCounter(async_engine.sync_engine),
+}
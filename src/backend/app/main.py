@@ -1,12 +1,12 @@
 import uvicorn
 
 from fastapi import FastAPI, Request
-from fastapi.responses import  RedirectResponse
+from fastapi.responses import  RedirectResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.sessions import SessionMiddleware
-from starlette.status import HTTP_303_SEE_OTHER
+from starlette.status import HTTP_303_SEE_OTHER, HTTP_400_BAD_REQUEST, HTTP_503_SERVICE_UNAVAILABLE
 from starlette_i18n import load_gettext_translations
 from starlette.middleware import Middleware
 
@@ -15,8 +15,13 @@ from app.core.authentication import AuthBackend
 from app.core.exceptions import UnAuthenticated
 from app.core.middleware import AuthenticationMiddleware, LocaleFromQueryParamsMiddleware
 from app.conf.config import settings, jwt_settings
+from app.db.filters import FilterError
+from app.db.pagination import CursorError
+from app.db.session import async_engine
 from app.routers.urls import router
 from app.sitemap import sitemap
+from app.utils.executors import ExecutorBusy
+from app.utils.security import load_jwt_keys, password_hasher
 
 
 def get_application() -> FastAPI:
@@ -51,6 +56,26 @@ def get_application() -> FastAPI:
     async def unauthenticated_template_exception_handler(request: Request, exc: UnAuthenticated):
         return RedirectResponse(settings.LOGIN_URL, status_code=HTTP_303_SEE_OTHER)
 
+    @application.exception_handler(CursorError)
+    @application.exception_handler(FilterError)
+    async def filter_error_exception_handler(request: Request, exc: ValueError):
+        return PlainTextResponse(str(exc), status_code=HTTP_400_BAD_REQUEST)
+
+    @application.exception_handler(ExecutorBusy)
+    async def executor_busy_exception_handler(request: Request, exc: ExecutorBusy):
+        return PlainTextResponse(
+            'Service busy, please retry', status_code=HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'},
+        )
+
+    @application.on_event('startup')
+    def startup_load_jwt_keys() -> None:
+        load_jwt_keys()
+
+    @application.on_event('shutdown')
+    async def dispose_async_engine() -> None:
+        await async_engine.dispose()
+        password_hasher.shutdown(wait=False)
+
     application.add_route(
         path='/sitemap.xml', route=sitemap,
     )
@@ -0,0 +1,70 @@
+import logging
+import signal
+import threading
+from typing import Optional
+
+from app.conf.config import settings
+from app.contrib.outbox.handlers import get_handler
+from app.contrib.outbox.models import utcnow
+from app.contrib.outbox.repository import outbox_repo
+from app.db.session import SessionLocal
+from app.utils.emails import smtp_pool
+import app.contrib.contact_us.jobs  # noqa, registers the handlers
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+stop_event = threading.Event()
+
+
+def run_batch(limit: Optional[int] = None) -> int:
+    """
+    Claim one batch of due jobs and run their handlers, returns the number of claimed jobs.
+    Every job is completed or failed as soon as its handler returns
+    """
+    with SessionLocal() as db:
+        jobs = outbox_repo.claim(db, limit=limit)
+        for job in jobs:
+            if job.available_at <= utcnow():
+                # The lease ran out while the previous jobs were running, another worker may own it now
+                logger.warning('Outbox job %s (%s) lease expired, left for the next claim', job.id, job.kind)
+                continue
+            try:
+                get_handler(job.kind)(job.payload)
+            except Exception as e:
+                logger.exception('Outbox job %s (%s) failed, attempt %s', job.id, job.kind, job.attempts)
+                outbox_repo.fail(db, db_obj=job, error=f'{type(e).__name__}: {e}')
+            else:
+                outbox_repo.complete(db, db_obj=job)
+    return len(jobs)
+
+
+def run(poll_interval: Optional[float] = None) -> None:
+    poll_interval = settings.OUTBOX_POLL_INTERVAL if poll_interval is None else poll_interval
+    while not stop_event.is_set():
+        try:
+            claimed = run_batch()
+        except Exception:
+            # Database unreachable or locked, keep the worker alive and try again later
+            logger.exception('Outbox batch failed')
+            claimed = 0
+        if not claimed:
+            stop_event.wait(poll_interval)
+
+
+def stop(*args) -> None:
+    logger.info("Stopping outbox worker")
+    stop_event.set()
+
+
+def main() -> None:
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    logger.info("Outbox worker started")
+    run()
+    smtp_pool.close()
+    logger.info("Outbox worker stopped")
+
+
+if __name__ == "__main__":
+    main()
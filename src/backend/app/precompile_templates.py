@@ -0,0 +1,34 @@
+"""
+Compile the site and email templates into the Jinja bytecode cache (JINJA_BYTECODE_CACHE_DIR),
+run at image build time so that fresh workers load compiled templates instead of parsing them
+
+    python -m app.precompile_templates
+"""
+import logging
+
+import jinja2
+
+from app.utils.emails import email_templates
+from app.utils.templating import templates
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt', '.xml')
+
+
+def precompile(env: jinja2.Environment) -> int:
+    names = env.list_templates(filter_func=lambda name: name.endswith(TEMPLATE_EXTENSIONS))
+    for name in names:
+        # get_template stores the compiled code in the environment bytecode cache
+        env.get_template(name)
+    return len(names)
+
+
+def main() -> None:
+    for label, env in (('site', templates.env), ('email', email_templates)):
+        logger.info("Compiled %s %s templates", precompile(env), label)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,12 @@
-from typing import Generator, Optional, Union, TYPE_CHECKING
+from typing import AsyncGenerator, Generator, Optional, Union, TYPE_CHECKING
 
 from fastapi import Depends, Request
 from starlette.authentication import BaseUser
 
 from app.conf.config import settings
-from app.core.exceptions import UnAuthenticated
-from app.db.session import SessionLocal
+from app.core.exceptions import InvalidCursor, UnAuthenticated
+from app.db.pagination import CursorError, decode_cursor
+from app.db.session import SessionLocal, AsyncSessionLocal
 
 if TYPE_CHECKING:
     from app.contrib.auth.models import User
@@ -19,6 +20,11 @@ def get_db() -> "Generator":
         db.close()
 
 
+async def get_async_db() -> "AsyncGenerator":
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def get_current_user(
         request: "Request",
 ) -> "BaseUser":
@@ -41,18 +47,29 @@ def get_authenticated_user(user: "BaseUser" = Depends(get_current_user)) -> "Use
     raise UnAuthenticated
 
 
+# Query params of get_commons and the i18n middleware, the remaining ones are candidate list filters
+COMMONS_PARAMS = ('order_by', 'offset', 'limit', 'page', 'cursor', 'search', 'lang')
+
+
 async def get_commons(
+        request: Request,
         order_by: Optional[str] = None,
         offset: Optional[int] = None,
         limit: Optional[int] = settings.PAGINATION_MAX_SIZE,
         page: Optional[int] = 1,
+        cursor: Optional[str] = None,
+        search: Optional[str] = None,
 ) -> dict:
     """
-    Get commons dict for list pagination and filter
+    Get commons dict for list pagination and filter, `q` holds the other query params,
+    views keep the filter DSL lookups (`created_at__gte=...`) among them with `CRUDBase.clean_filters`
+    :param request:
     :param order_by:
     :param offset:
     :param limit:
     :param page:
+    :param cursor: opaque keyset cursor, used by views paginating with `CRUDBase.get_page`
+    :param search: full-text query for views supporting `CRUDBase.search`
     :return:
     """
     if order_by is None:
@@ -65,4 +82,11 @@ async def get_commons(
         if page <= 0:
             page = 1
         offset = (page - 1) * limit
-    return {'limit': limit, 'offset': offset, 'order_by': order_by, 'page': page}
+    if cursor:
+        try:
+            cursor = decode_cursor(cursor)
+        except CursorError:
+            raise InvalidCursor
+    q = {key: value for key, value in request.query_params.items() if key not in COMMONS_PARAMS}
+    return {'limit': limit, 'offset': offset, 'order_by': order_by, 'page': page, 'cursor': cursor,
+            'search': search, 'q': q}
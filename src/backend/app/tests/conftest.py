@@ -0,0 +1,24 @@
+from typing import Iterator
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.db  # noqa: F401, registers every model
+from app.db.models import Base
+
+
+@pytest.fixture
+def db() -> Iterator[Session]:
+    """
+    Session on a fresh in-memory SQLite database holding every table
+    """
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
@@ -0,0 +1,128 @@
+import math
+from typing import Iterator, List
+
+import pytest
+import sqlalchemy as sa
+
+from app.contrib.contact_us.models import Message
+from app.contrib.contact_us.repository import message_repo
+from app.db.bulk import SQLITE_MAX_VARIABLES, get_chunk_size
+
+
+def make_rows(count: int, start: int = 0) -> List[dict]:
+    return [
+        {'fullname': 'F', 'email': f'm{i}@example.com', 'title': f'title {i}', 'body': '', 'company_name': '',
+         'phone_number': ''}
+        for i in range(start, start + count)
+    ]
+
+
+def get_titles(db) -> dict:
+    return dict(db.execute(sa.select(Message.id, Message.title)).all())
+
+
+@pytest.fixture
+def statements(db) -> Iterator[List[tuple]]:
+    """
+    (sql, number of bound parameters) of every statement the session executes
+    """
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append((statement, len(parameters[0] if executemany else parameters)))
+
+    engine = db.get_bind()
+    sa.event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    yield executed
+    sa.event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def test_chunk_size_stays_under_the_sqlite_variable_limit():
+    dialect = sa.create_engine('sqlite://').dialect
+    assert get_chunk_size(dialect, 10, 1000) == SQLITE_MAX_VARIABLES // 10
+    assert get_chunk_size(dialect, 10, 20) == 20
+    assert get_chunk_size(dialect, SQLITE_MAX_VARIABLES + 1, 1000) == 1
+
+
+def test_bulk_create_returns_the_ids_of_its_rows(db):
+    message_repo.bulk_create(db, objs_in=make_rows(3))
+    message_repo.bulk_delete(db, ids=[2])
+
+    ids = message_repo.bulk_create(db, objs_in=make_rows(4, start=3), chunk_size=3)
+    assert ids == [4, 5, 6, 7]
+    titles = get_titles(db)
+    assert [titles[pk] for pk in ids] == ['title 3', 'title 4', 'title 5', 'title 6']
+
+
+def test_bulk_create_is_chunked_at_the_sqlite_variable_limit(db, statements):
+    chunk_size = SQLITE_MAX_VARIABLES // len(Message.__table__.columns)
+    rows = make_rows(2 * chunk_size + 5)
+    ids = message_repo.bulk_create(db, objs_in=rows)
+
+    inserts = [params for sql, params in statements if sql.startswith('INSERT')]
+    assert len(inserts) == 3
+    assert all(params <= SQLITE_MAX_VARIABLES for params in inserts)
+    assert ids == list(range(1, len(rows) + 1))
+    assert message_repo.count(db, strategy='exact') == len(rows)
+
+
+def test_bulk_create_with_explicit_ids(db):
+    assert message_repo.bulk_create(db, objs_in=[dict(row, id=pk) for pk, row in zip((10, 5), make_rows(2))]) == [
+        10, 5,
+    ]
+    rows = make_rows(3, start=2)
+    rows[1]['id'] = 7
+    for row in rows[::2]:
+        row['id'] = None
+
+    ids = message_repo.bulk_create(db, objs_in=rows)
+    assert ids == [11, 7, 12]
+    titles = get_titles(db)
+    assert [titles[pk] for pk in ids] == ['title 2', 'title 3', 'title 4']
+
+
+def test_bulk_update_rows_by_id(db, statements):
+    ids = message_repo.bulk_create(db, objs_in=make_rows(SQLITE_MAX_VARIABLES))
+    statements.clear()
+
+    total = message_repo.bulk_update(db, objs_in=[{'id': pk, 'title': f'new {pk}'} for pk in ids])
+    assert total == len(ids)
+    assert get_titles(db) == {pk: f'new {pk}' for pk in ids}
+    updates = [params for sql, params in statements if sql.startswith('UPDATE')]
+    assert updates and all(params <= SQLITE_MAX_VARIABLES for params in updates)
+
+
+def test_bulk_update_values_by_ids_and_filter(db, statements):
+    ids = message_repo.bulk_create(db, objs_in=make_rows(SQLITE_MAX_VARIABLES + 10))
+    statements.clear()
+
+    assert message_repo.bulk_update(db, objs_in={'body': 'seen'}, ids=ids[:-1]) == len(ids) - 1
+    updates = [params for sql, params in statements if sql.startswith('UPDATE')]
+    # Chunked for one parameter per id plus the `body` value
+    assert len(updates) == math.ceil((len(ids) - 1) / (SQLITE_MAX_VARIABLES // 2))
+    assert all(params <= SQLITE_MAX_VARIABLES for params in updates)
+
+    matched = [pk for pk, row in zip(ids, make_rows(len(ids))) if row['email'].startswith('m2')]
+    assert message_repo.bulk_update(db, objs_in={'body': 'filtered'}, q={'email__prefix': 'm2'}) == len(matched)
+    bodies = dict(db.execute(sa.select(Message.id, Message.body)).all())
+    assert {pk for pk, body in bodies.items() if body == 'filtered'} == set(matched)
+    assert bodies[ids[-1]] == ''
+    assert bodies[ids[1]] == 'seen'
+    with pytest.raises(ValueError):
+        message_repo.bulk_update(db, objs_in={'body': 'all'})
+
+
+def test_bulk_delete(db, statements):
+    ids = message_repo.bulk_create(db, objs_in=make_rows(SQLITE_MAX_VARIABLES + 10))
+    statements.clear()
+
+    assert message_repo.bulk_delete(db, ids=ids[:-5]) == len(ids) - 5
+    deletes = [params for sql, params in statements if sql.startswith('DELETE')]
+    assert len(deletes) == 2
+    assert all(params <= SQLITE_MAX_VARIABLES for params in deletes)
+    assert sorted(get_titles(db)) == ids[-5:]
+
+    with pytest.raises(ValueError):
+        message_repo.bulk_delete(db)
+    assert message_repo.bulk_delete(db, q={}) == 5
+    assert get_titles(db) == {}
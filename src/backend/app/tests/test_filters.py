@@ -0,0 +1,108 @@
+from datetime import datetime
+
+import pytest
+import sqlalchemy as sa
+
+from app.contrib.auth.models import Email
+from app.contrib.auth.repository import email_repo
+from app.contrib.contact_us.models import Message
+from app.contrib.contact_us.repository import message_repo
+from app.db.filters import (
+    FilterError, get_filter_clauses, get_indexed_columns, get_order_by_clauses, parse_value, prefix_clause,
+    split_lookup,
+)
+
+
+def compile_sql(clause) -> str:
+    return str(clause.compile(dialect=sa.create_engine('sqlite://').dialect, compile_kwargs={'literal_binds': True}))
+
+
+def test_split_lookup():
+    assert split_lookup('email') == ('email', 'exact')
+    assert split_lookup('created_at__gte') == ('created_at', 'gte')
+
+
+def test_parse_value():
+    assert parse_value(Message.__table__.c.id, '5') == 5
+    assert parse_value(Message.__table__.c.created_at, '2022-03-01T12:00:00') == datetime(2022, 3, 1, 12)
+    assert parse_value(Email.__table__.c.is_active, 'off') is False
+    with pytest.raises(FilterError):
+        parse_value(Message.__table__.c.id, 'five')
+
+
+@pytest.mark.parametrize('prefix, expected', [
+    ('ab', "message.email >= 'ab' AND message.email < 'ac'"),
+    ('a', "message.email >= 'a' AND message.email < 'b'"),
+    ('', '1'),
+])
+def test_prefix_clause_is_a_half_open_range(prefix, expected):
+    assert compile_sql(prefix_clause(Message.__table__.c.email, prefix)) == expected
+
+
+def test_prefix_clause_matches_like_prefix(db):
+    emails = ['a@example.com', 'ab@example.com', 'abc@example.com', 'ac@example.com', 'b@example.com']
+    email_repo.bulk_create(db, objs_in=[{'email': email} for email in emails])
+    column = Email.__table__.c.email
+    for prefix in ('a', 'ab', 'abc', 'b', 'z'):
+        found = db.execute(sa.select(column).where(prefix_clause(column, prefix)).order_by(column)).scalars().all()
+        assert found == [email for email in emails if email.startswith(prefix)]
+
+
+def test_get_filter_clauses():
+    clauses = get_filter_clauses(Message, {
+        'id__in': '1,2', 'created_at__gte': '2022-03-01', 'email__prefix': 'ab', 'company_name__isnull': 'yes',
+    })
+    assert [compile_sql(clause) for clause in clauses] == [
+        'message.id IN (1, 2)',
+        "message.created_at >= '2022-03-01 00:00:00.000000'",
+        "message.email >= 'ab' AND message.email < 'ac'",
+        'message.company_name IS NULL',
+    ]
+
+
+@pytest.mark.parametrize('q', [
+    {'nope': '1'},
+    {'email__like': 'a%'},
+    {'created_at__lt': 'yesterday'},
+    {'company_name__isnull': 'maybe'},
+])
+def test_get_filter_clauses_rejects_invalid_filters(q):
+    with pytest.raises(FilterError):
+        get_filter_clauses(Message, q)
+
+
+def test_order_by_clauses():
+    clauses = get_order_by_clauses(Message, ['-created_at', 'id', Message.title.asc()])
+    assert [compile_sql(clause) for clause in clauses] == [
+        'message.created_at DESC', 'message.id ASC', 'message.title ASC',
+    ]
+    with pytest.raises(FilterError):
+        get_order_by_clauses(Message, ['title'], allowed={'id', 'created_at'})
+
+
+def test_indexed_columns():
+    assert {'id', 'created_at'} <= get_indexed_columns(Message.__table__)
+    assert 'title' not in get_indexed_columns(Message.__table__)
+
+
+def test_clean_filters_ignores_query_params_that_are_not_columns():
+    q = {'created_at__gte': '2022-03-01', 'id': '1', 'utm_source': 'mail', 'fbclid': 'abc'}
+    assert message_repo.clean_filters(q) == {'created_at__gte': '2022-03-01', 'id': '1'}
+    with pytest.raises(FilterError):
+        message_repo.clean_order_by(['-title'])
+
+
+@pytest.mark.parametrize('q', [{'title': 'foo'}, {'body__prefix': 'x'}, {'id': '1', 'title__in': 'a,b'}])
+def test_clean_filters_rejects_columns_that_are_not_whitelisted(q):
+    with pytest.raises(FilterError, match='not allowed'):
+        message_repo.clean_filters(q)
+
+
+def test_internal_filters_are_not_whitelisted(db):
+    email_repo.bulk_create(db, objs_in=[
+        {'email': 'on@example.com', 'is_active': True}, {'email': 'off@example.com', 'is_active': False},
+    ])
+    rows = message_repo.get_all(db, q={'title__prefix': 'x'}, order_by=['-title'])
+    assert rows == []
+    rows = email_repo.get_all(db, q={'is_active': True}, columns=('email',))
+    assert [row.email for row in rows] == ['on@example.com']
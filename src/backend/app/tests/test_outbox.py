@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import outbox_worker
+from app.conf.config import settings
+from app.contrib.outbox import handlers
+from app.contrib.outbox.models import STATUS_FAILED, STATUS_PENDING, OutboxJob, utcnow
+from app.contrib.outbox.repository import get_retry_delay, outbox_repo
+
+
+@pytest.fixture
+def retry_settings(monkeypatch):
+    monkeypatch.setattr(settings, 'OUTBOX_RETRY_DELAY', 30)
+    monkeypatch.setattr(settings, 'OUTBOX_RETRY_MAX_DELAY', 3600)
+    monkeypatch.setattr(settings, 'OUTBOX_MAX_ATTEMPTS', 3)
+
+
+def make_due(db, *jobs: OutboxJob) -> None:
+    for job in jobs:
+        job.available_at = utcnow() - timedelta(seconds=1)
+    db.commit()
+
+
+def as_utc(value):
+    # SQLite returns naive datetimes
+    return value if value.tzinfo else value.replace(tzinfo=utcnow().tzinfo)
+
+
+def test_retry_delay_doubles_up_to_the_maximum(retry_settings):
+    assert [get_retry_delay(attempts) for attempts in range(1, 10)] == [
+        30, 60, 120, 240, 480, 960, 1920, 3600, 3600,
+    ]
+
+
+def test_claim_takes_due_jobs_in_order_and_leases_them(db):
+    first = outbox_repo.enqueue(db, kind='a', payload={'n': 1})
+    second = outbox_repo.enqueue(db, kind='a', payload={'n': 2})
+    later = outbox_repo.enqueue(db, kind='a', payload={'n': 3})
+    later.available_at = utcnow() + timedelta(hours=1)
+    db.commit()
+
+    jobs = outbox_repo.claim(db, limit=1, lease=60)
+    assert [job.id for job in jobs] == [first.id]
+    assert jobs[0].attempts == 1
+    assert as_utc(jobs[0].available_at) > utcnow() + timedelta(seconds=50)
+
+    assert [job.id for job in outbox_repo.claim(db, lease=60)] == [second.id]
+    # Leased or not due yet
+    assert outbox_repo.claim(db, lease=60) == []
+
+
+def test_fail_backs_off_then_gives_up(db, retry_settings):
+    job = outbox_repo.enqueue(db, kind='a', payload={})
+    for attempt in range(1, settings.OUTBOX_MAX_ATTEMPTS + 1):
+        make_due(db, job)
+        [job] = outbox_repo.claim(db)
+        before = utcnow()
+        outbox_repo.fail(db, db_obj=job, error='boom' * 1000)
+        assert job.attempts == attempt
+        assert len(job.last_error) == 2000
+        if attempt < settings.OUTBOX_MAX_ATTEMPTS:
+            assert job.status == STATUS_PENDING
+            assert as_utc(job.available_at) >= before + timedelta(seconds=get_retry_delay(attempt))
+    assert job.status == STATUS_FAILED
+    make_due(db, job)
+    assert outbox_repo.claim(db) == []
+
+
+def test_complete_removes_the_job(db):
+    job = outbox_repo.enqueue(db, kind='a', payload={})
+    outbox_repo.complete(db, db_obj=job)
+    assert db.query(OutboxJob).count() == 0
+
+
+def test_run_batch(db, monkeypatch, retry_settings):
+    monkeypatch.setattr(outbox_worker, 'SessionLocal', sessionmaker(bind=db.get_bind(), expire_on_commit=False))
+    calls = []
+
+    def flaky(payload):
+        calls.append(payload)
+        if payload.get('fail'):
+            raise RuntimeError('smtp down')
+
+    monkeypatch.setitem(handlers.handlers, 'test', flaky)
+    outbox_repo.enqueue(db, kind='test', payload={'n': 1})
+    outbox_repo.enqueue(db, kind='test', payload={'n': 2, 'fail': True})
+    outbox_repo.enqueue(db, kind='missing', payload={})
+
+    assert outbox_worker.run_batch() == 3
+    assert calls == [{'n': 1}, {'n': 2, 'fail': True}]
+    db.expire_all()
+    left = {job.kind: job for job in db.query(OutboxJob)}
+    assert set(left) == {'test', 'missing'}
+    assert left['test'].last_error == 'RuntimeError: smtp down'
+    assert left['missing'].last_error.startswith('LookupError')
+    assert outbox_worker.run_batch() == 0
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.contrib.config.repository import config_repo
+from app.db.models import Base
+from app.main import app
+from app.routers.dependency import get_async_db
+from app.utils.page_cache import page_cache
+
+
+@pytest.fixture
+def client() -> Iterator[TestClient]:
+    """
+    Client of the app on a fresh in-memory SQLite database, with empty page and config caches
+    """
+    engine = create_async_engine(
+        'sqlite+aiosqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool,
+    )
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def get_test_db():
+        async with session_factory() as db:
+            yield db
+
+    asyncio.run(create_tables(engine))
+    app.dependency_overrides[get_async_db] = get_test_db
+    config_repo.invalidate()
+    page_cache.cache.clear()
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(get_async_db, None)
+        config_repo.invalidate()
+        page_cache.cache.clear()
+        asyncio.run(engine.dispose())
+
+
+async def create_tables(engine) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+def test_home_page_is_cached_per_language(client: TestClient):
+    en = client.get('/?lang=en')
+    ru = client.get('/?lang=ru')
+    assert en.status_code == ru.status_code == 200
+    assert en.text != ru.text
+    assert en.headers['etag'] != ru.headers['etag']
+
+    # Served from the cache, each language keeps its own page
+    assert client.get('/?lang=en').text == en.text
+    assert client.get('/?lang=ru').text == ru.text
+
+
+def test_etag_of_another_language_is_not_matched(client: TestClient):
+    en = client.get('/?lang=en')
+    response = client.get('/?lang=ru', headers={'If-None-Match': en.headers['etag']})
+    assert response.status_code == 200
+    assert client.get('/?lang=en', headers={'If-None-Match': en.headers['etag']}).status_code == 304
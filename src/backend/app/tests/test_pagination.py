@@ -0,0 +1,106 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+import sqlalchemy as sa
+
+from app.contrib.contact_us.models import Message
+from app.contrib.contact_us.repository import message_repo
+from app.db.pagination import (
+    NEXT, PREV, CursorError, _seek_condition, decode_cursor, encode_cursor, get_sort_keys,
+)
+
+
+def compile_sql(clause) -> str:
+    return str(clause.compile(dialect=sa.create_engine('sqlite://').dialect, compile_kwargs={'literal_binds': True}))
+
+
+@pytest.mark.parametrize('values', [
+    [datetime(2022, 3, 1, 12, 30, 15, 123456), 7],
+    [date(2022, 3, 1), 'slug', None],
+    [Decimal('10.50'), True, 1.5],
+])
+def test_cursor_round_trip(values):
+    cursor = encode_cursor(values, PREV)
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == {'values': values, 'direction': PREV}
+
+
+@pytest.mark.parametrize('cursor', [
+    'not base64 !',
+    encode_cursor([1])[:-3],
+    encode_cursor([1], direction='sideways'),
+    'eyJ2IjoxLCJkIjoibmV4dCJ9',  # {"v":1,"d":"next"}
+])
+def test_decode_invalid_cursor(cursor):
+    with pytest.raises(CursorError):
+        decode_cursor(cursor)
+
+
+def test_sort_keys_add_primary_key_tiebreaker():
+    keys = get_sort_keys(Message, [Message.created_at.desc()])
+    assert [(column.key, descending) for column, descending in keys] == [('created_at', True), ('id', True)]
+    keys = get_sort_keys(Message, ['title', '-id'])
+    assert [(column.key, descending) for column, descending in keys] == [('title', False), ('id', True)]
+
+
+def test_seek_condition_same_direction_uses_row_values():
+    keys = get_sort_keys(Message, [Message.created_at.desc()])
+    sql = compile_sql(_seek_condition(keys, [datetime(2022, 3, 1, 12, 0, 0, 500), 5], NEXT, 'sqlite'))
+    assert sql == "(message.created_at, message.id) < ('2022-03-01 12:00:00.000500', 5)"
+    sql = compile_sql(_seek_condition(keys, [datetime(2022, 3, 1, 12, 0, 0, 500), 5], PREV, 'sqlite'))
+    assert sql == "(message.created_at, message.id) > ('2022-03-01 12:00:00.000500', 5)"
+
+
+def test_seek_condition_sqlite_whole_second_uses_stored_text():
+    keys = get_sort_keys(Message, [Message.created_at.desc()])
+    sql = compile_sql(_seek_condition(keys, [datetime(2022, 3, 1, 12, 0), 5], NEXT, 'sqlite'))
+    assert sql == (
+        "(message.created_at, message.id) < (coalesce((SELECT message.created_at \nFROM message \n"
+        "WHERE message.id = 5), '2022-03-01 12:00:00'), 5)"
+    )
+    sql = compile_sql(_seek_condition(keys, [datetime(2022, 3, 1, 12, 0), 5], NEXT, 'postgresql'))
+    assert sql == "(message.created_at, message.id) < ('2022-03-01 12:00:00.000000', 5)"
+
+
+def test_seek_condition_mixed_directions_expands():
+    keys = get_sort_keys(Message, ['title', '-id'])
+    sql = compile_sql(_seek_condition(keys, ['b', 5], NEXT, 'sqlite'))
+    assert sql == "message.title > 'b' OR message.title = 'b' AND message.id < 5"
+
+
+def test_seek_condition_rejects_wrong_number_of_values():
+    keys = get_sort_keys(Message, [Message.created_at.desc()])
+    with pytest.raises(CursorError):
+        _seek_condition(keys, [5], NEXT, 'sqlite')
+
+
+def test_get_page_walks_forward_and_back(db):
+    started = datetime(2022, 3, 1)
+    # Two rows per second, stored like server_default timestamps and like Python ones alternately
+    for i in range(7):
+        created_at = started + timedelta(seconds=i // 2)
+        db.execute(sa.text("INSERT INTO message (fullname, email, title, body, created_at) "
+                           "VALUES ('', :email, :title, '', :created_at)"), {
+            'email': f'{i}@example.com', 'title': str(i),
+            'created_at': created_at.strftime('%Y-%m-%d %H:%M:%S' if i % 2 else '%Y-%m-%d %H:%M:%S.%f'),
+        })
+    db.commit()
+    newest_first = (Message.created_at.desc(),)
+    expected = [row.id for row in message_repo.get_page(db, order_by=newest_first, limit=100).items]
+    assert len(expected) == 7
+
+    forward, page = [], message_repo.get_page(db, order_by=newest_first, limit=3)
+    assert page.prev_cursor is None
+    while True:
+        forward.append([row.id for row in page.items])
+        if not page.next_cursor:
+            break
+        page = message_repo.get_page(db, order_by=newest_first, limit=3, cursor=decode_cursor(page.next_cursor))
+    assert forward == [expected[0:3], expected[3:6], expected[6:]]
+
+    backward = []
+    while page.prev_cursor:
+        page = message_repo.get_page(db, order_by=newest_first, limit=3, cursor=decode_cursor(page.prev_cursor))
+        backward.append([row.id for row in page.items])
+    assert backward == [expected[3:6], expected[0:3]]
@@ -1,12 +1,13 @@
 import emails
+import jinja2
 import logging
-import os
-from pathlib import Path
-from typing import Any, Dict, Optional, List, TYPE_CHECKING
-from emails.template import JinjaTemplate
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, Optional, List, Sequence, Tuple, TYPE_CHECKING
 from starlette_i18n import gettext_lazy as _
 from app.conf.config import settings
-from app.utils.templating import templates
+from app.utils.smtp import SMTPPool
+from app.utils.templating import get_bytecode_cache, templates
 from app.contrib.auth.repository import email_repo
 from app.contrib.config.repository import config_repo
 from app.db.session import SessionLocal
@@ -17,21 +18,21 @@ if TYPE_CHECKING:
     from app.contrib.contact_us.models import Message
 
 
-def send_email(
-        email_to: str,
-        subject_template: str = "",
-        html_template: str = "",
-        environment: Dict[str, Any] = None,
-        attachments: Optional[list] = None,
-) -> None:
-    assert settings.EMAILS_ENABLED, "no provided configuration for email variables"
-    if environment is None:
-        environment = {}
-    message = emails.Message(
-        subject=JinjaTemplate(subject_template, environment=templates.env),
-        html=JinjaTemplate(html_template, environment=templates.env),
-        mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
-    )
+# Site environment (i18n, globals, autoescape) loading the email templates, parsed once per process
+# and compiled once per deploy thanks to the bytecode cache
+email_templates = templates.env.overlay(
+    loader=jinja2.FileSystemLoader(settings.EMAIL_TEMPLATES_DIR),
+    bytecode_cache=get_bytecode_cache(),
+    auto_reload=bool(settings.DEBUG),
+)
+
+
+@lru_cache(maxsize=128)
+def get_string_template(source: str) -> jinja2.Template:
+    return email_templates.from_string(source)
+
+
+def get_smtp_options() -> dict:
     smtp_options = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
 
     if settings.SMTP_TLS:
@@ -40,37 +41,175 @@ def send_email(
         smtp_options["user"] = settings.SMTP_USER
     if settings.SMTP_PASSWORD:
         smtp_options["password"] = settings.SMTP_PASSWORD
-    response = message.send(to=email_to, render=environment, smtp=smtp_options)
-    logging.info(f"send email result: {response}")
-    return response
+    return smtp_options
+
+
+smtp_pool = SMTPPool(
+    get_smtp_options(), maxsize=settings.SMTP_POOL_SIZE, idle_timeout=settings.SMTP_POOL_IDLE_TIMEOUT,
+)
+
+
+def send_message(
+        message: emails.Message,
+        emails_to: Sequence[str],
+        pool: SMTPPool = smtp_pool,
+) -> List[Any]:
+    """
+    Send a rendered message to every recipient separately (own To header) over one pooled SMTP session
+    :return: SMTP response per recipient
+    """
+    responses = []
+    with pool.connection() as smtp:
+        for email_to in emails_to:
+            response = message.send(to=email_to, smtp=smtp)
+            if not response.success:
+                # Connection level errors leave the session in an unknown state, start a new one
+                smtp.close()
+            responses.append(response)
+    return responses
+
+
+def get_delivery_error(response) -> Optional[str]:
+    if response.success:
+        return None
+    return repr(response.error) if response.error else repr(response)
+
+
+def get_message(subject: str, html: str, mail_from: Optional[Tuple[str, str]] = None) -> emails.Message:
+    return emails.Message(
+        subject=subject, html=html, mail_from=mail_from or (settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
+    )
+
+
+def send_fanout(
+        subject: str,
+        html: str,
+        emails_to: Sequence[str],
+        *,
+        mail_from: Optional[Tuple[str, str]] = None,
+        concurrency: Optional[int] = None,
+        pool: SMTPPool = smtp_pool,
+) -> Dict[str, Optional[str]]:
+    """
+    Send a rendered subject and html body to every recipient, spread over at most `concurrency`
+    SMTP sessions sending in parallel threads, so the time grows with len(emails_to) / concurrency
+    :param concurrency: defaults to settings.SMTP_FANOUT_CONCURRENCY
+    :return: error per recipient, None for the delivered ones
+    """
+    emails_to = list(dict.fromkeys(emails_to))
+    if not emails_to:
+        return {}
+    concurrency = min(concurrency or settings.SMTP_FANOUT_CONCURRENCY, len(emails_to))
+    chunks = [emails_to[i::concurrency] for i in range(concurrency)]
+
+    def send_chunk(chunk: List[str]) -> Dict[str, Optional[str]]:
+        # Message.send rewrites the To header, every thread needs its own message
+        message = get_message(subject, html, mail_from)
+        try:
+            return {
+                email_to: get_delivery_error(response)
+                for email_to, response in zip(chunk, send_message(message, chunk, pool=pool))
+            }
+        except Exception as e:
+            logger.exception('Sending to %s recipients failed', len(chunk))
+            return dict.fromkeys(chunk, repr(e))
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='smtp-fanout') as executor:
+        for chunk_results in executor.map(send_chunk, chunks):
+            results.update(chunk_results)
+    return results
+
+
+def render_email(
+        subject_template: str = "",
+        html_template: str = "",
+        environment: Dict[str, Any] = None,
+        template_name: Optional[str] = None,
+) -> Tuple[str, str]:
+    """
+    Render the subject and the html body, from `template_name` of EMAIL_TEMPLATES_DIR when given
+    """
+    assert settings.EMAILS_ENABLED, "no provided configuration for email variables"
+    if environment is None:
+        environment = {}
+    if template_name:
+        html_body = email_templates.get_template(template_name)
+    else:
+        html_body = get_string_template(html_template)
+    return get_string_template(str(subject_template)).render(**environment), html_body.render(**environment)
+
+
+def render_message(
+        subject_template: str = "",
+        html_template: str = "",
+        environment: Dict[str, Any] = None,
+        template_name: Optional[str] = None,
+) -> emails.Message:
+    return get_message(*render_email(subject_template, html_template, environment, template_name=template_name))
+
+
+def send_bulk_email(
+        emails_to: Sequence[str],
+        subject_template: str = "",
+        html_template: str = "",
+        environment: Dict[str, Any] = None,
+        attachments: Optional[list] = None,
+        template_name: Optional[str] = None,
+) -> List[Any]:
+    """
+    Render the templates once and send the result to every address of `emails_to`
+    """
+    message = render_message(subject_template, html_template, environment, template_name=template_name)
+    responses = send_message(message, emails_to)
+    logging.info(f"send email results: {responses}")
+    return responses
+
+
+def send_email(
+        email_to: str,
+        subject_template: str = "",
+        html_template: str = "",
+        environment: Dict[str, Any] = None,
+        attachments: Optional[list] = None,
+        template_name: Optional[str] = None,
+) -> None:
+    return send_bulk_email(
+        [email_to], subject_template=subject_template, html_template=html_template, environment=environment,
+        attachments=attachments, template_name=template_name,
+    )[0]
 
 
 def send_test_email(email_to: str) -> None:
     project_name = settings.PROJECT_NAME
     subject = f"{project_name} - Test email"
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "test_email.html") as f:
-        template_str = f.read()
     return send_email(
         email_to=email_to,
         subject_template=subject,
-        html_template=template_str,
+        template_name="test_email.html",
         environment={"project_name": settings.PROJECT_NAME, "email": email_to},
     )
 
 
-def send_contact_us_messages(message: "Message"):
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "contact_messages.html") as f:
-        template_str = f.read()
-    db = SessionLocal()
-    config = config_repo.get_by_params(db, {})
-    if not config:
-        config = config_repo.create(db)
-    subject = _("%(site_name)s - contact messages") % {'site_name': config.site_name}
-    recipient_emails = email_repo.get_all(db, q={'is_active': True})
-    for email_to in recipient_emails:
-        return send_email(
-            email_to=email_to.email,
-            subject_template=subject,
-            html_template=template_str,
-            environment={"site_name": config.site_name, "message": message},
-        )
+def send_contact_us_messages(
+        message: "Message", emails_to: Optional[Sequence[str]] = None,
+) -> Dict[str, Optional[str]]:
+    """
+    Notify `emails_to`, every active Email by default, of a new contact message
+    :return: error per recipient, None for the delivered ones
+    """
+    with SessionLocal() as db:
+        config = config_repo.get_solo(db)
+        subject = _("%(site_name)s - contact messages") % {'site_name': config.site_name}
+        if emails_to is None:
+            emails_to = [
+                row.email for row in email_repo.get_all(db, q={'is_active': True}, limit=None, columns=('email',))
+            ]
+    subject, html = render_email(
+        subject, environment={"site_name": config.site_name, "message": message},
+        template_name="contact_messages.html",
+    )
+    results = send_fanout(subject, html, emails_to)
+    logger.info('contact message %s delivered to %s of %s recipients',
+                message.id, sum(error is None for error in results.values()), len(results))
+    return results
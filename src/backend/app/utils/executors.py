@@ -0,0 +1,70 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class ExecutorBusy(RuntimeError):
+    """
+    Raised instead of queueing when a BoundedExecutor already holds `max_pending` jobs
+    """
+
+
+class BoundedExecutor:
+    """
+    Dedicated thread pool with a queue-depth limit, keeps slow CPU bound work
+    (password hashing) off the event loop and off Starlette's shared threadpool
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, name: str = 'bounded-executor'):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise ExecutorBusy(f'{self.pending} jobs are already pending')
+            self.pending += 1
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._done()
+            raise
+        future.add_done_callback(lambda f: self._done(completed=True))
+        return future
+
+    def _done(self, completed: bool = False) -> None:
+        with self._lock:
+            self.pending -= 1
+            if completed:
+                self.completed += 1
+
+    def call(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        """
+        Run `fn` in the pool and block the calling thread until it returns
+        """
+        return self.submit(fn, *args, **kwargs).result()
+
+    async def async_call(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        """
+        Run `fn` in the pool without blocking the event loop
+        """
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def stats(self) -> dict:
+        return {
+            'max_workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'pending': self.pending,
+            'completed': self.completed,
+            'rejected': self.rejected,
+        }
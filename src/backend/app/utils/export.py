@@ -0,0 +1,53 @@
+import csv
+import io
+import json
+from typing import Any, Iterable, Iterator, Sequence
+
+# Cells starting with these are run as formulas by spreadsheet apps
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _json_default(value: Any) -> str:
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def iter_csv(rows: Iterable[Any], fields: Sequence[str], chunk_rows: int = 500) -> Iterator[str]:
+    """
+    CSV text of `rows` with a header line, yielded in chunks of `chunk_rows` rows
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for index, row in enumerate(rows, 1):
+        writer.writerow([_csv_value(getattr(row, field)) for field in fields])
+        if index % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(rows: Iterable[Any], fields: Sequence[str], chunk_rows: int = 500) -> Iterator[str]:
+    """
+    One JSON object per line, yielded in chunks of `chunk_rows` rows
+    """
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({field: getattr(row, field) for field in fields}, default=_json_default))
+        if len(lines) == chunk_rows:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv'),
+    'ndjson': (iter_ndjson, 'application/x-ndjson'),
+}
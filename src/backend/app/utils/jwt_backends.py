@@ -0,0 +1,119 @@
+from typing import Any, Optional
+
+import jwt as pyjwt
+from jwt.algorithms import get_default_algorithms
+from jose import jwk, jwt
+from jose.exceptions import JWTError, ExpiredSignatureError
+
+__all__ = ('BaseJWTBackend', 'JoseJWTBackend', 'PyJWTBackend')
+
+
+class BaseJWTBackend:
+    """
+    Signs and verifies tokens with keys parsed once at construction time.
+
+    `decode` raises `jose.JWTError` whatever the library, so callers
+    (AuthBackend) keep catching a single exception type
+    """
+
+    def __init__(
+            self,
+            algorithm: str,
+            signing_key: Any,
+            verification_key: Optional[Any] = None,
+            *,
+            verify: bool = True,
+            verify_expiration: bool = True,
+            leeway: int = 0,
+            audience: Any = None,
+            issuer: Any = None,
+    ):
+        self.algorithm = algorithm
+        self.signing_key = self.prepare_key(signing_key)
+        self.verification_key = self.prepare_key(verification_key or signing_key)
+        self.verify = verify
+        self.verify_expiration = verify_expiration
+        self.leeway = leeway
+        self.audience = audience
+        self.issuer = issuer
+
+    @classmethod
+    def from_settings(cls, jwt_settings) -> "BaseJWTBackend":
+        return cls(
+            jwt_settings.JWT_ALGORITHM,
+            jwt_settings.JWT_PRIVATE_KEY or jwt_settings.JWT_SECRET_KEY,
+            jwt_settings.JWT_PUBLIC_KEY or jwt_settings.JWT_SECRET_KEY,
+            verify=jwt_settings.JWT_VERIFY,
+            verify_expiration=jwt_settings.JWT_VERIFY_EXPIRATION,
+            leeway=jwt_settings.JWT_LEEWAY,
+            audience=jwt_settings.JWT_AUDIENCE,
+            issuer=jwt_settings.JWT_ISSUER,
+        )
+
+    def prepare_key(self, key: Any) -> Any:
+        raise NotImplementedError()  # pragma: no cover
+
+    def encode(self, payload: dict) -> str:
+        raise NotImplementedError()  # pragma: no cover
+
+    def decode(self, token: str) -> dict:
+        raise NotImplementedError()  # pragma: no cover
+
+
+class JoseJWTBackend(BaseJWTBackend):
+    """
+    python-jose implementation, supports HS*, RS* and ES* algorithms
+    """
+
+    def prepare_key(self, key: Any) -> Any:
+        return jwk.construct(key, self.algorithm)
+
+    def encode(self, payload: dict) -> str:
+        return jwt.encode(payload, self.signing_key, self.algorithm)
+
+    def decode(self, token: str) -> dict:
+        return jwt.decode(
+            token=token,
+            key=self.verification_key,
+            algorithms=[self.algorithm],
+            options={
+                'verify_signature': self.verify,
+                'verify_exp': self.verify_expiration,
+                'leeway': self.leeway,
+            },
+            audience=self.audience,
+            issuer=self.issuer,
+        )
+
+
+class PyJWTBackend(BaseJWTBackend):
+    """
+    PyJWT implementation backed by `cryptography`, adds EdDSA (Ed25519) and PS* algorithms
+    """
+
+    def prepare_key(self, key: Any) -> Any:
+        return get_default_algorithms()[self.algorithm].prepare_key(key)
+
+    def encode(self, payload: dict) -> str:
+        return pyjwt.encode(payload, self.signing_key, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> dict:
+        try:
+            return pyjwt.decode(
+                token,
+                key=self.verification_key,
+                algorithms=[self.algorithm],
+                options={
+                    'verify_signature': self.verify,
+                    'verify_exp': self.verify_expiration,
+                    'verify_aud': self.audience is not None,
+                    'verify_iss': self.issuer is not None,
+                },
+                leeway=self.leeway,
+                audience=self.audience,
+                issuer=self.issuer,
+            )
+        except pyjwt.ExpiredSignatureError as e:
+            raise ExpiredSignatureError(str(e)) from e
+        except pyjwt.PyJWTError as e:
+            raise JWTError(str(e)) from e
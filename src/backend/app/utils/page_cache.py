@@ -0,0 +1,61 @@
+import hashlib
+from typing import Hashable, Optional, Tuple
+
+from fastapi import Request
+from starlette.responses import Response
+from starlette_i18n import i18n
+from starlette.status import HTTP_304_NOT_MODIFIED
+
+from app.conf.config import settings
+from .cache import TTLCache
+
+
+class PageCache:
+    """
+    Opt-in cache of rendered pages for anonymous GET requests, answers
+    `If-None-Match` with 304 whether or not the page came from the cache
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def is_cacheable(request: Request) -> bool:
+        return (
+                request.method == 'GET'
+                and not request.session.get('_messages')
+                and not request.user.is_authenticated
+        )
+
+    @staticmethod
+    def make_key(request: Request, *parts: Hashable) -> Tuple[Hashable, ...]:
+        # The locale the middleware resolved for this request, unsupported `lang` values fall back to the default
+        return (request.url.path, i18n.get_locale_code(), *parts)
+
+    @staticmethod
+    def _build_response(request: Request, body: bytes, etag: str, media_type: Optional[str]) -> Response:
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Cookie'}
+        if_none_match = request.headers.get('if-none-match', '')
+        if etag in (tag.strip() for tag in if_none_match.split(',')):
+            return Response(status_code=HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(body, media_type=media_type, headers=headers)
+
+    def get_response(self, request: Request, key: Hashable) -> Optional[Response]:
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        return self._build_response(request, *entry)
+
+    def store(self, request: Request, key: Hashable, response: Response) -> Response:
+        """
+        Cache a rendered 200 response and return what should be sent for this request
+        """
+        if response.status_code != 200:
+            return response
+        body = response.body
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        self.cache.set(key, (body, etag, response.media_type))
+        return self._build_response(request, body, etag, response.media_type)
+
+
+page_cache = PageCache(maxsize=settings.PAGE_CACHE_SIZE, ttl=settings.PAGE_CACHE_TTL)
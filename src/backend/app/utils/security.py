@@ -1,30 +1,61 @@
 import os
 import json
+import time
 
-from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
 from cryptography.hazmat.primitives import serialization
 from fastapi.encoders import jsonable_encoder
 from fastapi import Request
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, Tuple
 
 from fastapi.security.utils import get_authorization_scheme_param
 from fastapi.openapi.models import OAuthFlows as OAuthFlowsModel
 from fastapi.security import OAuth2, OAuth2PasswordRequestForm
-from jose import jwt
 from passlib.context import CryptContext
 from starlette.status import HTTP_403_FORBIDDEN
 from fastapi.exceptions import HTTPException
 from app.conf.config import settings, jwt_settings, structure_settings
+from .cache import TTLCache
+from .executors import BoundedExecutor
+from .metrics import LabeledHistogram
 from .import_utils import perform_import
+from .jwt_backends import BaseJWTBackend, JoseJWTBackend, PyJWTBackend
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-__all__ = ('get_token', 'jwt_payload', 'jwt_encode', 'jwt_decode', 'verify_password', 'get_password_hash',
-           'generate_rsa_certificate', 'lazy_jwt_settings')
+
+def get_crypt_context() -> CryptContext:
+    options = {}
+    if 'bcrypt' in settings.PASSWORD_SCHEMES:
+        options['bcrypt__rounds'] = settings.PASSWORD_BCRYPT_ROUNDS
+    if 'argon2' in settings.PASSWORD_SCHEMES:
+        options.update({
+            'argon2__time_cost': settings.PASSWORD_ARGON2_TIME_COST,
+            'argon2__memory_cost': settings.PASSWORD_ARGON2_MEMORY_COST,
+            'argon2__parallelism': settings.PASSWORD_ARGON2_PARALLELISM,
+        })
+    return CryptContext(schemes=settings.PASSWORD_SCHEMES, deprecated="auto", **options)
+
+
+pwd_context = get_crypt_context()
+password_verify_seconds = LabeledHistogram()
+password_hasher = BoundedExecutor(
+    max_workers=settings.PASSWORD_HASHER_WORKERS,
+    max_pending=settings.PASSWORD_HASHER_MAX_PENDING,
+    name='password-hasher',
+)
+
+__all__ = ('get_token', 'jwt_payload', 'jwt_encode', 'jwt_decode', 'pyjwt_encode', 'pyjwt_decode',
+           'verify_password', 'get_password_hash', 'generate_rsa_certificate', 'generate_ed25519_certificate',
+           'lazy_jwt_settings', 'load_jwt_keys', 'jwt_decode_cache', 'password_hasher', 'verify_and_update_password',
+           'password_verify_seconds')
+
+jwt_decode_cache = TTLCache(maxsize=jwt_settings.JWT_DECODE_CACHE_SIZE, ttl=jwt_settings.JWT_DECODE_CACHE_TTL)
 
 IMPORT_STRINGS = (
     'JWT_PASSWORD_VERIFY',
+    'JWT_PASSWORD_VERIFY_AND_UPDATE',
     'JWT_PASSWORD_HANDLER',
     'JWT_ENCODE_HANDLER',
     'JWT_DECODE_HANDLER',
@@ -54,43 +85,89 @@ def jwt_payload(data: dict, expires_delta: Optional[timedelta] = None) -> dict:
     return payload
 
 
+@lru_cache(maxsize=None)
+def get_jose_backend() -> JoseJWTBackend:
+    return JoseJWTBackend.from_settings(jwt_settings)
+
+
+@lru_cache(maxsize=None)
+def get_pyjwt_backend() -> PyJWTBackend:
+    return PyJWTBackend.from_settings(jwt_settings)
+
+
+def load_jwt_keys() -> None:
+    """
+    Parse the PEM/secret keys of the configured handlers once, instead of on every encode/decode
+    """
+    for handler in (lazy_jwt_settings.JWT_ENCODE_HANDLER, lazy_jwt_settings.JWT_DECODE_HANDLER):
+        get_backend = JWT_HANDLER_BACKENDS.get(handler)
+        if get_backend is not None:
+            get_backend()
+
+
+def get_jwt_decode_cache_ttl(payload: dict) -> float:
+    ttl = jwt_settings.JWT_DECODE_CACHE_TTL
+    exp = payload.get('exp')
+    if jwt_settings.JWT_VERIFY_EXPIRATION and exp is not None:
+        # Same rule as jose: the token is rejected once `exp < now - leeway`
+        ttl = min(ttl, int(exp) + jwt_settings.JWT_LEEWAY - time.time())
+    return ttl
+
+
+def cached_jwt_decode(token: str, backend: BaseJWTBackend) -> dict:
+    payload = jwt_decode_cache.get(token)
+    if payload is None:
+        payload = backend.decode(token)
+        jwt_decode_cache.set(token, payload, ttl=get_jwt_decode_cache_ttl(payload))
+    return dict(payload)
+
+
 def jwt_encode(payload, context=None) -> str:
-    return jwt.encode(
-        jsonable_encoder(payload),
-        jwt_settings.JWT_PRIVATE_KEY or jwt_settings.JWT_SECRET_KEY,
-        jwt_settings.JWT_ALGORITHM,
-    )
+    return get_jose_backend().encode(jsonable_encoder(payload))
 
 
 def jwt_decode(token, context=None) -> dict:
-    return jwt.decode(
-        token=token,
-        key=jwt_settings.JWT_PUBLIC_KEY or jwt_settings.JWT_SECRET_KEY,
-        algorithms=[jwt_settings.JWT_ALGORITHM],
-        options={
-            'verify_signature': jwt_settings.JWT_VERIFY,
-            'verify_exp': jwt_settings.JWT_VERIFY_EXPIRATION,
-            'leeway': jwt_settings.JWT_LEEWAY,
-        },
-        audience=jwt_settings.JWT_AUDIENCE,
-        issuer=jwt_settings.JWT_ISSUER,
-    )
+    return cached_jwt_decode(token, get_jose_backend())
+
+
+def pyjwt_encode(payload, context=None) -> str:
+    return get_pyjwt_backend().encode(jsonable_encoder(payload))
+
+
+def pyjwt_decode(token, context=None) -> dict:
+    return cached_jwt_decode(token, get_pyjwt_backend())
+
+
+JWT_HANDLER_BACKENDS = {
+    jwt_encode: get_jose_backend,
+    jwt_decode: get_jose_backend,
+    pyjwt_encode: get_pyjwt_backend,
+    pyjwt_decode: get_pyjwt_backend,
+}
+
+
+def get_password_scheme(hashed_password: str) -> str:
+    return pwd_context.identify(hashed_password, required=False) or 'unknown'
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with password_verify_seconds.labels(get_password_scheme(hashed_password)).time():
+        return pwd_context.verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify the password and return a new hash when the scheme or its cost settings changed
+    """
+    with password_verify_seconds.labels(get_password_scheme(hashed_password)).time():
+        return pwd_context.verify_and_update(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
-def generate_rsa_certificate():
-    private_key = rsa.generate_private_key(
-        public_exponent=65537,
-        key_size=2048
-    )
-
+def serialize_key_pair(private_key) -> dict:
     private_key_str = private_key.private_bytes(
         encoding=serialization.Encoding.PEM,
         format=serialization.PrivateFormat.PKCS8,
@@ -104,11 +181,13 @@ def generate_rsa_certificate():
         format=serialization.PublicFormat.SubjectPublicKeyInfo,
     )
 
-    secrets: dict = {
+    return {
         'private_key': private_key_str.decode("utf-8"),
         'public_key': public_key_str.decode("utf-8")
     }
 
+
+def save_secrets(secrets: dict) -> dict:
     path = os.path.join(structure_settings.PROJECT_DIR, 'conf', 'secrets.json')
 
     with open(path, 'w') as f:
@@ -117,6 +196,21 @@ def generate_rsa_certificate():
     return secrets
 
 
+def generate_rsa_certificate():
+    private_key = rsa.generate_private_key(
+        public_exponent=65537,
+        key_size=2048
+    )
+    return save_secrets(serialize_key_pair(private_key))
+
+
+def generate_ed25519_certificate():
+    """
+    Key pair for JWT_ALGORITHM=EdDSA, use it with the pyjwt_encode/pyjwt_decode handlers
+    """
+    return save_secrets(serialize_key_pair(ed25519.Ed25519PrivateKey.generate()))
+
+
 class JWTSettings:
 
     def __init__(self, defaults, import_strings):
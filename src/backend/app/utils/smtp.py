@@ -0,0 +1,72 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+
+from emails.backend import SMTPBackend
+
+__all__ = ('SMTPPool',)
+
+
+class SMTPPool:
+    """
+    Reusable SMTP sessions (`emails` SMTPBackend), a connection idle for more than
+    `idle_timeout` seconds is closed instead of reused, at most `maxsize` idle ones are kept
+    """
+
+    def __init__(self, options: dict, maxsize: int = 2, idle_timeout: float = 30):
+        self.options = options
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.opened = 0
+        self.reused = 0
+        self._idle: List[Tuple[SMTPBackend, float]] = []
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> SMTPBackend:
+        expired = []
+        backend = None
+        now = time.monotonic()
+        with self._lock:
+            while self._idle:
+                candidate, released_at = self._idle.pop()
+                if now - released_at < self.idle_timeout:
+                    backend = candidate
+                    self.reused += 1
+                    break
+                expired.append(candidate)
+            else:
+                self.opened += 1
+        for candidate in expired:
+            candidate.close()
+        # The backend connects on its first sendmail and reconnects once when the server dropped it
+        return backend or SMTPBackend(**self.options)
+
+    def _release(self, backend: SMTPBackend) -> None:
+        with self._lock:
+            if len(self._idle) < self.maxsize:
+                self._idle.append((backend, time.monotonic()))
+                return
+        backend.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[SMTPBackend]:
+        """
+        Borrow a session, it is closed instead of returned when the block raises
+        """
+        backend = self._acquire()
+        try:
+            yield backend
+        except BaseException:
+            backend.close()
+            raise
+        self._release(backend)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for backend, _ in idle:
+            backend.close()
+
+    def stats(self) -> dict:
+        return {'opened': self.opened, 'reused': self.reused, 'idle': len(self._idle)}
@@ -1,4 +1,5 @@
 import logging
+import os
 from datetime import datetime
 
 from fastapi import Request
@@ -7,7 +8,7 @@ from typing import Any
 from starlette_i18n import gettext_lazy as _, get_locale_code
 from gettext import ngettext
 
-from app.conf.config import structure_settings
+from app.conf.config import settings, structure_settings
 from app.utils.urls import include_query_params
 
 try:
@@ -37,6 +38,17 @@ def get_flashed_messages(request: Request):
     return request.session.pop("_messages") if "_messages" in request.session else []
 
 
+def get_bytecode_cache() -> "jinja2.BytecodeCache":
+    """
+    Compiled templates on disk, shared by the workers and kept over restarts.
+    Entries are checked against the template source, an edited template is recompiled
+    """
+    directory = settings.JINJA_BYTECODE_CACHE_DIR
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return jinja2.FileSystemBytecodeCache(directory)
+
+
 class SilentUndefined(jinja2.Undefined):
     """
     Dont break page loads because vars arent there!
@@ -54,6 +66,10 @@ class Jinja2Templates(BaseJinja2Templates):
 
         env.undefined = SilentUndefined
         env.loader = loader
+        # Compiled templates survive restarts (see app.precompile_templates), and in production
+        # templates are not stat()ed on every render to look for changes
+        env.bytecode_cache = get_bytecode_cache()
+        env.auto_reload = bool(settings.DEBUG)
 
         env.autoescape = True
         env.add_extension('jinja2.ext.i18n')
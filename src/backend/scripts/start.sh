@@ -30,6 +30,18 @@ else
     echo "There is no script $PRE_START_PATH"
 fi
 
+# Outbox worker (queued emails) next to the web workers, restarted whenever it exits.
+# docker-compose runs it as the `worker` service instead and sets RUN_OUTBOX_WORKER=false
+if [ "${RUN_OUTBOX_WORKER:-true}" = "true" ] ; then
+    (
+        while true ; do
+            poetry run python -m app.outbox_worker || true
+            echo "Outbox worker exited, restarting in 5s"
+            sleep 5
+        done
+    ) &
+fi
+
 # Start Gunicorn
 #exec gunicorn -k "$WORKER_CLASS" -c "$GUNICORN_CONF" "$APP_MODULE" -w 4
 #exec ./venv/bin/gunicorn -k "$WORKER_CLASS" -c "$GUNICORN_CONF" "$APP_MODULE"